@@ -1,11 +1,18 @@
 import requests
+import ijson
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
 from dotenv import load_dotenv
 from loguru import logger
 from time import sleep
 import os
-import json
+import orjson
 import time
 import argparse
+import threading
+from collections import deque
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from unidecode import unidecode
 
 load_dotenv()
@@ -13,6 +20,90 @@ load_dotenv()
 
 logger.add("debug.log", format="{time} {level} {message}", level="DEBUG")
 
+# Shared session so every call reuses pooled keep-alive connections
+session = requests.Session()
+adapter = HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=32,
+    max_retries=Retry(
+        total=4,
+        backoff_factor=1,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=frozenset(["GET", "PUT", "PATCH", "DELETE"]),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    ),
+)
+session.mount("http://", adapter)
+session.mount("https://", adapter)
+
+# Request bodies are encoded with orjson, so the content type is set explicitly
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+MAX_WORKERS = 10
+DELETE_WORKERS = 25
+BULK_CHUNK_SIZE = 500
+
+# TripAdvisor Content API limit, shared by all worker threads
+TRIPADVISOR_CALLS_PER_PERIOD = 200
+TRIPADVISOR_PERIOD_SECONDS = 60
+
+# HTTP methods of /api/restaurants/bulk/ the API answered with 404/405. They are
+# only tried once; after that their callers go straight to the per-item fallback.
+unsupported_bulk_methods = set()
+
+
+class RateLimiter:
+    """Thread-safe sliding-window limiter allowing `calls` acquisitions per `period` seconds."""
+
+    def __init__(self, calls, period):
+        self.calls = calls
+        self.period = period
+        self.timestamps = deque()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                while self.timestamps and now - self.timestamps[0] >= self.period:
+                    self.timestamps.popleft()
+
+                if len(self.timestamps) < self.calls:
+                    self.timestamps.append(now)
+                    return
+
+                wait = self.period - (now - self.timestamps[0])
+            sleep(wait)
+
+
+tripadvisor_rate_limiter = RateLimiter(TRIPADVISOR_CALLS_PER_PERIOD, TRIPADVISOR_PERIOD_SECONDS)
+
+
+def build_city_string(city):
+    if city.get('region') is not None:
+        if region := city['region']['name']:
+            return f"{city['name']} {region} {city['country']['name']}"
+    return f"{city['name']} {city['country']['name']}"
+
+
+def run_concurrently(worker, cities):
+    """Runs worker for every city on a thread pool and returns the results that are not None."""
+    results = []
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        future_to_city = {executor.submit(worker, city): city for city in cities}
+
+        for future in as_completed(future_to_city):
+            city = future_to_city[future]
+            try:
+                result = future.result()
+                if result is not None:
+                    results.append(result)
+            except Exception as e:
+                logger.error(f"City {city.get('geoname_id')} generated an exception: {e}")
+
+    return results
+
 
 def get_non_geoid_cities(country=None):
 
@@ -22,14 +113,13 @@ def get_non_geoid_cities(country=None):
     all_cities = []
 
     while True:
-        response = requests.get(url)
+        response = session.get(url)
         if response.status_code == 200:
-            for city in response.json()['results']:
-                all_cities.append(city)
+            payload = orjson.loads(response.content)
+            all_cities.extend(payload['results'])
 
-            if response.json()['next']:
-                url = response.json()['next']
-            else:
+            url = payload.get('next')
+            if not url:
                 break
         else:
             response.raise_for_status()
@@ -43,14 +133,13 @@ def get_cities_with_geoid():
     all_cities = []
 
     while True:
-        response = requests.get(url)
+        response = session.get(url)
         if response.status_code == 200:
-            for city in response.json()['results']:
-                all_cities.append(city)
-            
-            if response.json()['next']:
-                url = response.json()['next']
-            else:
+            payload = orjson.loads(response.content)
+            all_cities.extend(payload['results'])
+
+            url = payload.get('next')
+            if not url:
                 break
         else:
             response.raise_for_status()
@@ -61,33 +150,50 @@ def get_cities_with_geoid():
 def check_all_cities_geo_ids():
     cities = get_cities_with_geoid()
     logger.info(f"Found {len(cities)} cities with existing geo IDs to check")
-    
-    for city in cities:
-        sleep(0.3)
-        if city.get('region') is not None:
-            if region := city['region']['name']:
-                city_string = f"{city['name']} {region} {city['country']['name']}"
-            else:
-                city_string = f"{city['name']} {city['country']['name']}"
-        else:
-            city_string = f"{city['name']} {city['country']['name']}"
 
+    # The lookups run concurrently; the changes they find are confirmed here one
+    # at a time once the workers are done, so no log output runs over a prompt
+    changes = run_concurrently(check_city_geo_id, cities)
+    logger.info(f"Found {len(changes)} cities with a different Geo ID")
+
+    for city, city_string, current_geo_id, new_geo_id in changes:
         try:
-            logger.info(f"Checking city: {unidecode(city_string)} (GeoName ID: {city['geoname_id']}, Current Geo ID: {city.get('tripadvisor_geo_id')})")
-            city_has_correct_geo_id(city, unidecode(city_string))
-            update_last_scraped(city['geoname_id'])
+            confirm_geo_id_change(city, city_string, current_geo_id, new_geo_id)
         except Exception as e:
-            logger.error(f"Error checking city {city_string}: {e}")
+            logger.error(f"Error updating city {city_string}: {e}")
+
+        try:
             update_last_scraped(city['geoname_id'])
-            continue
+        except Exception as e:
+            logger.error(f"City {city.get('geoname_id')} generated an exception: {e}")
+
+
+def check_city_geo_id(city):
+    """
+    Looks up the city's Geo ID on TripAdvisor. Returns the change to confirm,
+    or None when there is nothing to change; the city is then marked as scraped.
+    """
+    city_string = build_city_string(city)
+    ascii_city = unidecode(city_string)
+
+    try:
+        logger.info(f"Checking city: {ascii_city} (GeoName ID: {city['geoname_id']}, Current Geo ID: {city.get('tripadvisor_geo_id')})")
+        change = find_geo_id_change(city, ascii_city)
+        if change is not None:
+            return change
+        update_last_scraped(city['geoname_id'])
+    except Exception as e:
+        logger.error(f"Error checking city {city_string}: {e}")
+        update_last_scraped(city['geoname_id'])
+    return None
 
 
 def get_current_city_geo_id(geoname_id):
 
     url = f"http://127.0.0.1:8000/api/cities/{geoname_id}/"
-    response = requests.get(url)
+    response = session.get(url)
     if response.status_code == 200:
-        data = response.json()
+        data = orjson.loads(response.content)
         return data.get('tripadvisor_geo_id', None)
 
 
@@ -107,7 +213,7 @@ def update_city_geo_id(geoname_id, geo_id):
         "tripadvisor_attractions_url": ""
     }
 
-    response = requests.put(url, json=data, headers=headers)
+    response = session.put(url, data=orjson.dumps(data), headers=headers)
     if response.status_code == 200:
         logger.info(f"Updated city {geoname_id} with Geo ID {geo_id}")
     else:
@@ -115,6 +221,79 @@ def update_city_geo_id(geoname_id, geo_id):
         response.raise_for_status()
 
 
+def bulk_delete_restaurants(restaurant_ids):
+    """
+    Delete restaurants through the bulk endpoint in chunks of BULK_CHUNK_SIZE.
+
+    Returns:
+        Number of restaurants deleted, or None if the API has no bulk endpoint
+    """
+    if "DELETE" in unsupported_bulk_methods:
+        return None
+
+    url = "http://127.0.0.1:8000/api/restaurants/bulk/"
+    deleted_count = 0
+
+    for i in range(0, len(restaurant_ids), BULK_CHUNK_SIZE):
+        chunk = restaurant_ids[i:i + BULK_CHUNK_SIZE]
+        response = session.delete(url, data=orjson.dumps({"ids": chunk}), headers=JSON_HEADERS)
+
+        if i == 0 and response.status_code in [404, 405]:
+            unsupported_bulk_methods.add("DELETE")
+            return None
+
+        if response.status_code in [200, 204]:
+            deleted_count += len(chunk)
+            logger.debug(f"Bulk deleted {len(chunk)} restaurants")
+        else:
+            logger.warning(f"Failed to bulk delete {len(chunk)} restaurants: {response.status_code}")
+
+    return deleted_count
+
+
+def bulk_update_restaurants_geoname_id(restaurant_ids, geoname_id):
+    """
+    Move restaurants to another city through the bulk endpoint in chunks of BULK_CHUNK_SIZE.
+
+    Returns:
+        True if all chunks were updated, False if the API has no bulk endpoint
+    """
+    if "PATCH" in unsupported_bulk_methods:
+        return False
+
+    url = "http://127.0.0.1:8000/api/restaurants/bulk/"
+
+    for i in range(0, len(restaurant_ids), BULK_CHUNK_SIZE):
+        chunk = restaurant_ids[i:i + BULK_CHUNK_SIZE]
+        response = session.patch(
+            url, data=orjson.dumps({"ids": chunk, "geoname_id": geoname_id}), headers=JSON_HEADERS
+        )
+
+        if i == 0 and response.status_code in [404, 405]:
+            unsupported_bulk_methods.add("PATCH")
+            return False
+
+        if response.status_code == 200:
+            logger.info(f"Updated {len(chunk)} restaurants to new GeoName ID {geoname_id}")
+        else:
+            logger.error(f"Failed to bulk update {len(chunk)} restaurants: {response.status_code} - {response.text}")
+            response.raise_for_status()
+
+    return True
+
+
+def delete_restaurant(restaurant_id):
+    delete_url = f"http://127.0.0.1:8000/api/restaurants/{restaurant_id}/"
+    delete_response = session.delete(delete_url)
+
+    if delete_response.status_code in [200, 204]:
+        logger.debug(f"Deleted restaurant {restaurant_id}")
+        return True
+
+    logger.warning(f"Failed to delete restaurant {restaurant_id}: {delete_response.status_code}")
+    return False
+
+
 def unlink_restaurants_from_city(geoname_id):
     """
     Delete all restaurants linked to a city.
@@ -129,38 +308,40 @@ def unlink_restaurants_from_city(geoname_id):
     restaurants_url = f"http://127.0.0.1:8000/api/restaurants/search/?geoname_id={geoname_id}&page_size=100000"
     
     try:
-        response = requests.get(restaurants_url)
-        if response.status_code != 200:
-            logger.error(f"Failed to fetch restaurants for geoname_id {geoname_id}: {response.status_code}")
-            return 0
-            
-        restaurants = response.json()['results']
-        deleted_count = 0
-        
-        if not restaurants:
+        with session.get(restaurants_url, stream=True) as response:
+            if response.status_code != 200:
+                logger.error(f"Failed to fetch restaurants for geoname_id {geoname_id}: {response.status_code}")
+                return 0
+
+            # Stream only the IDs instead of materializing every restaurant record
+            response.raw.decode_content = True
+            restaurant_ids = list(ijson.items(response.raw, 'results.item.id'))
+
+        if not restaurant_ids:
             logger.info(f"No restaurants found for geoname_id {geoname_id}")
             return 0
             
-        logger.info(f"Found {len(restaurants)} restaurants to unlink for geoname_id {geoname_id}")
+        logger.info(f"Found {len(restaurant_ids)} restaurants to unlink for geoname_id {geoname_id}")
         
-        for restaurant in restaurants:
-            restaurant_id = restaurant['id']
-            delete_url = f"http://127.0.0.1:8000/api/restaurants/{restaurant_id}/"
-            
-            try:
-                delete_response = requests.delete(delete_url)
-                
-                if delete_response.status_code in [200, 204]:
-                    deleted_count += 1
-                    logger.debug(f"Deleted restaurant {restaurant_id}: {restaurant.get('name', 'Unknown')}")
-                else:
-                    logger.warning(f"Failed to delete restaurant {restaurant_id}: {delete_response.status_code}")
-                    
-            except Exception as e:
-                logger.error(f"Error deleting restaurant {restaurant_id}: {e}")
-                continue
-        
-        logger.info(f"Successfully deleted {deleted_count}/{len(restaurants)} restaurants for geoname_id {geoname_id}")
+        deleted_count = bulk_delete_restaurants(restaurant_ids)
+
+        if deleted_count is None:
+            # No bulk endpoint available, fall back to one DELETE per restaurant
+            deleted_count = 0
+            with ThreadPoolExecutor(max_workers=DELETE_WORKERS) as executor:
+                future_to_restaurant_id = {
+                    executor.submit(delete_restaurant, restaurant_id): restaurant_id
+                    for restaurant_id in restaurant_ids
+                }
+
+                for future in as_completed(future_to_restaurant_id):
+                    try:
+                        if future.result():
+                            deleted_count += 1
+                    except Exception as e:
+                        logger.error(f"Error deleting restaurant {future_to_restaurant_id[future]}: {e}")
+
+        logger.info(f"Successfully deleted {deleted_count}/{len(restaurant_ids)} restaurants for geoname_id {geoname_id}")
         return deleted_count
         
     except Exception as e:
@@ -175,16 +356,26 @@ def change_city_geoname_id(old_geoname_id, new_geoname_id):
     """
 
     restaurants_url = f"http://127.0.0.1:8000/api/restaurants/search/?geoname_id={old_geoname_id}&page_size=100000"
-    restaurants = requests.get(restaurants_url).json()['results']
-    logger.info(f"Found {len(restaurants)} restaurants for city with old GeoName ID {old_geoname_id}")
+    with session.get(restaurants_url, stream=True) as response:
+        if response.status_code != 200:
+            logger.error(f"Failed to fetch restaurants for old GeoName ID {old_geoname_id}: {response.status_code}")
+            response.raise_for_status()
+            return
 
-    for restaurant in restaurants:
-        restaurant_id = restaurant['id']
+        response.raw.decode_content = True
+        restaurant_ids = list(ijson.items(response.raw, 'results.item.id'))
+    logger.info(f"Found {len(restaurant_ids)} restaurants for city with old GeoName ID {old_geoname_id}")
+
+    if bulk_update_restaurants_geoname_id(restaurant_ids, new_geoname_id):
+        return
+
+    # No bulk endpoint available, fall back to one PUT per restaurant
+    for restaurant_id in restaurant_ids:
         update_url = f"http://127.0.0.1:8000/api/restaurants/{restaurant_id}/"
         data = {
             "geoname_id": new_geoname_id
         }
-        response = requests.put(update_url, json=data)
+        response = session.put(update_url, data=orjson.dumps(data), headers=JSON_HEADERS)
 
         if response.status_code == 200:
             logger.info(f"Updated restaurant {restaurant_id} to new GeoName ID {new_geoname_id}")
@@ -196,7 +387,7 @@ def change_city_geoname_id(old_geoname_id, new_geoname_id):
 def update_last_scraped(geoname_id):
 
     url = f"http://127.0.0.1:8000/api/cities/{geoname_id}/update-scraped/"
-    response = requests.patch(url)
+    response = session.patch(url)
     if response.status_code == 200:
         logger.info(f"Updated last_scraped for city {geoname_id}")
         return True
@@ -206,127 +397,139 @@ def update_last_scraped(geoname_id):
         return False
 
 
-def city_has_correct_geo_id(city, city_string):
+def find_geo_id_change(city, city_string):
+    """Returns (city, city_string, current Geo ID, new Geo ID) when TripAdvisor gives a different Geo ID, else None."""
     current_geo_id = get_current_city_geo_id(city['geoname_id'])
     if current_geo_id is not None:
         new_geo_id = search_city_on_tripadvisor(city, city_string)
         if new_geo_id and new_geo_id != current_geo_id:
-            logger.info("-" * 40)
-            logger.warning(f"City {city_string} has a different Geo ID {current_geo_id} than found {new_geo_id}, updating.")
-            logger.info("-" * 40)
-            logger.info(f"old: https://www.tripadvisor.com/findRestaurants?geo={current_geo_id}")
-            logger.info(f"new: https://www.tripadvisor.com/findRestaurants?geo={new_geo_id}")
-            logger.info(f"map: https://www.google.com/maps/search/?api=1&query={city['latitude']}%2C{city['longitude']}")
-            logger.info("-" * 40)
-
-            # Count restaurants that will be affected
-            restaurants_url = f"http://127.0.0.1:8000/api/restaurants/search/?geoname_id={city['geoname_id']}&page_size=1"
-            try:
-                count_response = requests.get(restaurants_url)
-                if count_response.status_code == 200:
-                    total_count = count_response.json().get('count', 0)
-                    if total_count > 0:
-                        logger.warning(f"⚠️  This will unlink {total_count} restaurants from the current city")
-            except Exception as e:
-                logger.debug(f"Could not count restaurants: {e}")
-            
-            user_input = input("Change the Geo ID? Press Y to confirm...")
-
-            if user_input.strip().lower() == 'y':
-                # First unlink all restaurants from the city
-                deleted_count = unlink_restaurants_from_city(city['geoname_id'])
-                if deleted_count > 0:
-                    logger.info(f"Unlinked {deleted_count} restaurants from the city before updating geo_id")
-                
-                # Then update the city's geo_id
-                update_city_geo_id(city['geoname_id'], new_geo_id)
-                return True
-            else:
-                logger.info("Skipped updating Geo ID.")
-                return False
+            return city, city_string, current_geo_id, new_geo_id
         else:
             logger.info(f"City {city_string} has correct Geo ID: {current_geo_id}")
-            return True
+    return None
+
+
+def confirm_geo_id_change(city, city_string, current_geo_id, new_geo_id):
+    """Asks whether to apply a Geo ID change and applies it when confirmed. Runs on the main thread."""
+    logger.info("-" * 40)
+    logger.warning(f"City {city_string} has a different Geo ID {current_geo_id} than found {new_geo_id}, updating.")
+    logger.info("-" * 40)
+    logger.info(f"old: https://www.tripadvisor.com/findRestaurants?geo={current_geo_id}")
+    logger.info(f"new: https://www.tripadvisor.com/findRestaurants?geo={new_geo_id}")
+    logger.info(f"map: https://www.google.com/maps/search/?api=1&query={city['latitude']}%2C{city['longitude']}")
+    logger.info("-" * 40)
+
+    # Count restaurants that will be affected
+    restaurants_url = f"http://127.0.0.1:8000/api/restaurants/search/?geoname_id={city['geoname_id']}&page_size=1"
+    try:
+        count_response = session.get(restaurants_url)
+        if count_response.status_code == 200:
+            total_count = orjson.loads(count_response.content).get('count', 0)
+            if total_count > 0:
+                logger.warning(f"⚠️  This will unlink {total_count} restaurants from the current city")
+    except Exception as e:
+        logger.debug(f"Could not count restaurants: {e}")
+
+    user_input = input("Change the Geo ID? Press Y to confirm...")
+
+    if user_input.strip().lower() == 'y':
+        # First unlink all restaurants from the city
+        deleted_count = unlink_restaurants_from_city(city['geoname_id'])
+        if deleted_count > 0:
+            logger.info(f"Unlinked {deleted_count} restaurants from the city before updating geo_id")
+
+        # Then update the city's geo_id
+        update_city_geo_id(city['geoname_id'], new_geo_id)
+        return True
     else:
+        logger.info("Skipped updating Geo ID.")
         return False
 
 
-def search_city_on_tripadvisor(city, city_string):
+@lru_cache(maxsize=50000)
+def search_tripadvisor_geos(search_query):
+    """
+    Search TripAdvisor geos for a normalized query string.
+    Results are cached per query, so repeated cities only hit the API once per run.
+    """
     tripadvisor_api_key = os.getenv("TRIPADVISOR_API_KEY", "7FD0231ADB7A456E820809EAC91E1389")
 
     # url for search by name
-    search_url = f"https://api.content.tripadvisor.com/api/v1/location/search?key={tripadvisor_api_key}&category=geos&searchQuery={city_string}"
+    search_url = f"https://api.content.tripadvisor.com/api/v1/location/search?key={tripadvisor_api_key}&category=geos&searchQuery={search_query}"
 
     # latlong nearby search
     # latlong = f"{city['latitude']},{city['longitude']}"
     # search_url = f"https://api.content.tripadvisor.com/api/v1/location/nearby_search?latLong={latlong}&key={tripadvisor_api_key}&category=geos&language=en"
-    logger.info(f"Searching for city: {city_string}")
 
-    max_retries = 5
-    retry_count = 0
-    retry_delay = 1
-
-    while retry_count < max_retries:
-        response = requests.get(search_url)
-        if response.status_code == 200:
-            break
-        elif response.status_code == 429:
-            retry_count += 1
-            # Check for Retry-After header
-            retry_after = response.headers.get('Retry-After')
-            if retry_after:
-                try:
-                    retry_delay = int(retry_after)
-                    logger.warning(f"Rate limited (429) for city {city_string}. Retry {retry_count}/{max_retries} in {retry_delay} seconds (from Retry-After header)...")
-                except ValueError:
-                    retry_delay = min(retry_delay * 2, 60)
-                    logger.warning(f"Rate limited (429) for city {city_string}. Retry {retry_count}/{max_retries} in {retry_delay} seconds...")
-            else:
-                retry_delay = min(retry_delay * 2, 60)
-                logger.warning(f"Rate limited (429) for city {city_string}. Retry {retry_count}/{max_retries} in {retry_delay} seconds...")
-            time.sleep(retry_delay)
-        elif response.status_code == 500:
-            retry_count += 1
-            logger.warning(f"Server error (500) for city {city_string}. Retry {retry_count}/{max_retries} in {retry_delay} seconds...")
-            time.sleep(retry_delay)
-            retry_delay = min(retry_delay * 2, 30)
-        else:
-            break
+    # 429 and 5xx responses are retried by the session, honouring Retry-After
+    tripadvisor_rate_limiter.acquire()
+    response = session.get(search_url, timeout=(3, 10))
 
     if response.status_code == 200:
-        data = response.json()
-        if items := data.get('data'):
-            for item in items:
-                """
-                {
-                    "location_id": "311293",
-                    "name": "Tianjin",
-                    "distance": "4.142198689704845",
-                    "bearing": "south",
-                    "address_obj": {
-                        "street1": "",
-                        "street2": "",
-                        "state": "Tianjin Region",
-                        "country": "China",
-                        "postalcode": "",
-                        "address_string": "Tianjin China"
-                    }
+        return tuple(orjson.loads(response.content).get('data') or ())
+
+    logger.error(f"Error searching for query {search_query}: {response.status_code} - {response.text}")
+    response.raise_for_status()
+    return ()
+
+
+def search_city_on_tripadvisor(city, city_string):
+    logger.info(f"Searching for city: {city_string}")
+    search_query = " ".join(city_string.lower().split())
+
+    if items := search_tripadvisor_geos(search_query):
+        for item in items:
+            """
+            {
+                "location_id": "311293",
+                "name": "Tianjin",
+                "distance": "4.142198689704845",
+                "bearing": "south",
+                "address_obj": {
+                    "street1": "",
+                    "street2": "",
+                    "state": "Tianjin Region",
+                    "country": "China",
+                    "postalcode": "",
+                    "address_string": "Tianjin China"
                 }
-                """
+            }
+            """
 
-                if str(item.get('name')).lower() == str(city['name']).lower() and item.get('address_obj', {}).get('country', '').lower() == city['country']['name'].lower():
-                    logger.info(f"Found matching city: {item['name']} in {item['address_obj']['country']} with Geo ID: {item['location_id']}")
-                    return item['location_id']
+            if str(item.get('name')).lower() == str(city['name']).lower() and item.get('address_obj', {}).get('country', '').lower() == city['country']['name'].lower():
+                logger.info(f"Found matching city: {item['name']} in {item['address_obj']['country']} with Geo ID: {item['location_id']}")
+                return item['location_id']
 
-            logger.warning(f"No exact match found for city: {city_string}. Available items: {[item['name'] for item in items]}")
-        else:
-            logger.warning(f"No data found for city: {city_string}")
+        logger.warning(f"No exact match found for city: {city_string}. Available items: {[item['name'] for item in items]}")
     else:
-        logger.error(f"Error searching for city {city_string}: {response.status_code} - {response.text}")
-        response.raise_for_status()
+        logger.warning(f"No data found for city: {city_string}")
     return None
 
 
+def find_city_geo_id(city):
+    city_string = build_city_string(city)
+    ascii_city = unidecode(city_string)
+
+    try:
+        logger.info(f"Processing city: {ascii_city} (GeoName ID: {city['geoname_id']})")
+        geo_id = search_city_on_tripadvisor(city, ascii_city)
+        if geo_id is None:
+            logger.error(f"No Geo ID found for city: {city_string}")
+            update_last_scraped(city['geoname_id'])
+            return
+    except Exception as e:
+        logger.error(f"Error searching for city {city_string}: {e}")
+        update_last_scraped(city['geoname_id'])
+        return
+
+    try:
+        update_city_geo_id(city['geoname_id'], geo_id)
+        update_last_scraped(city['geoname_id'])
+    except Exception as e:
+        logger.error(f"Error updating city {city['geoname_id']}: {e}")
+        update_last_scraped(city['geoname_id'])
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='TripAdvisor City Geo ID Manager')
     parser.add_argument('--check', action='store_true', help='Check existing geo IDs for correctness')
@@ -339,33 +542,4 @@ if __name__ == "__main__":
     else:
         logger.info(f"Starting normal mode - finding geo IDs for cities without them{f' in country: {args.country}' if args.country else ''}")
         cities = get_non_geoid_cities(country=args.country)
-        for city in cities:
-            sleep(0.3)
-            if city.get('region') is not None:
-                if region := city['region']['name']:
-                    city_string = f"{city['name']} {region} {city['country']['name']}"
-                else:
-                    city_string = f"{city['name']} {city['country']['name']}"
-            else:
-                city_string = f"{city['name']} {city['country']['name']}"
-
-            try:
-                logger.info(f"Processing city: {unidecode(city_string)} (GeoName ID: {city['geoname_id']})")
-                geo_id = search_city_on_tripadvisor(city, unidecode(city_string))
-                if geo_id is None:
-                    logger.error(f"No Geo ID found for city: {city_string}")
-                    update_last_scraped(city['geoname_id'])
-                    continue
-            except Exception as e:
-                logger.error(f"Error searching for city {city_string}: {e}")
-                update_last_scraped(city['geoname_id'])
-                continue
-
-            try:
-                update_city_geo_id(city['geoname_id'], geo_id)
-                update_last_scraped(city['geoname_id'])
-            except Exception as e:
-                logger.error(f"Error updating city {city['geoname_id']}: {e}")
-                update_last_scraped(city['geoname_id'])
-                continue
-
+        run_concurrently(find_city_geo_id, cities)
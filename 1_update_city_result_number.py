@@ -1,97 +1,195 @@
 from spider_cloud import SpiderAPI
 import requests
+from requests.adapters import HTTPAdapter
+import orjson
 import dotenv
 import re
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Dict, Optional
+import os
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional
 
 dotenv.load_dotenv()
 
-client = SpiderAPI()
+MAX_WORKERS = 25
+
+client = SpiderAPI(pool_maxsize=MAX_WORKERS)
+
+# Shared keep-alive session for the local API, sized for the worker pool
+session = requests.Session()
+session.mount("http://", HTTPAdapter(pool_maxsize=MAX_WORKERS))
+
+# First page of the TripAdvisor restaurant list for a geo ID
+RESTAURANTS_URL_TEMPLATE = (
+    "https://www.tripadvisor.com/FindRestaurants"
+    "?geo={}"
+    "&establishmentTypes=10591,11776,12208,16548,16556,9900,9901,9909,21908"
+    "&minimumTravelerRating=TRAVELER_RATING_LOW"
+    "&broadened=false"
+    "&offset=0"
+)
+
+# Patterns used by parse_results_number, compiled once for all worker threads.
+# Numbers must start with a digit, so a lone comma is never captured.
+RESULTS_TOTAL_PATTERN = re.compile(r'data-automation="resultsTotal"[^>]*>\s*(\d[\d,]*)')
+NUMBER_PATTERN = re.compile(r'(\d[\d,]*)')
+RESULTS_PATTERN = re.compile(r'\d+.*results', re.I)
+NO_RESULTS_PATTERN = re.compile(r'no.*results|0.*results', re.I)
+
+# Worker processes for the BeautifulSoup fallback, which few pages need
+PARSE_WORKERS = min(4, os.cpu_count() or 1)
+
+# Started by get_parse_executor when the first page misses the regex fast path
+parse_executor: Optional[ProcessPoolExecutor] = None
+parse_executor_lock = threading.Lock()
 
 
 def get_empty_results_city(country_code: Optional[str] = None):
-    """Fetches cities with no TripAdvisor restaurant URL or results."""
-    url = (
-        "http://127.0.0.1:8000/api/cities/search/"
-        "?tripadvisor_geo_id_is_null=false&page_size=10000"
-    )
+    """
+    Fetches cities with no TripAdvisor restaurant URL or results.
+    Pages are followed until the API's count is reached; on an error no
+    cities are returned, since a partial list would look complete.
+    """
+    all_cities = []
+    page = 1
+    page_size = 1000
+
+    while True:
+        url = (
+            "http://127.0.0.1:8000/api/cities/search/"
+            "?tripadvisor_geo_id_is_null=false"
+            f"&page={page}"
+            f"&page_size={page_size}"
+        )
 
-    if country_code:
-        url += f"&country={country_code}"
+        # Filter by country on the server so other countries are never sent
+        if country_code:
+            url += f"&country={country_code}"
+
+        try:
+            # The whole page is kept as the city list anyway, so it is decoded in one go
+            with session.get(url) as response:
+                if response.status_code != 200:
+                    print(f"API error on page {page}: {response.status_code}")
+                    return []
+                data = orjson.loads(response.content)
+        except Exception as e:
+            print(f"Error fetching cities page {page}: {e}")
+            return []
 
-    response = requests.get(url)
-    if response.status_code == 200:
-        data = response.json()
-        if data:
-            return data['results']
+        cities = data.get('results') or []
+        all_cities.extend(cities)
+
+        # The server may cap page_size, so the page length says nothing about the end
+        count = data.get('count', len(all_cities))
+        if not cities or not data.get('next', True) or len(all_cities) >= count:
+            break
+
+        page += 1
+
+    return all_cities
+
+
+def decode_content(content) -> str:
+    """Returns the scraped page as text, whichever shape the Spider API used."""
+    # Current Spider responses are plain strings, so check that shape first
+    if type(content) is str:
+        return content
+    # Older responses are a list of byte values, decoded in one C-level pass
+    return bytes(content).decode('utf-8', errors='replace')
+
+
+def parse_results_from_html(decoded: str) -> tuple[Optional[int], bool]:
+    """
+    Parses the number of results from the page HTML with BeautifulSoup.
+    This is CPU-bound, so main runs it in a process pool to keep it off the GIL.
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(decoded, 'lxml')
+
+    # Find element with data-automation="resultsTotal"
+    element = soup.find(attrs={"data-automation": "resultsTotal"})
+
+    if element:
+        # Extract text and parse number
+        text = element.get_text(strip=True)
+
+        # Use regex to extract numbers from text like "1,234 results" or "234 results"
+        match = NUMBER_PATTERN.search(text)
+        if match:
+            # Remove commas and convert to int
+            number_str = match.group(1).replace(',', '')
+            result = int(number_str)
+            return result, True
         else:
-            raise ValueError("No Cities with null results found")
+            # Check if the text indicates 0 results explicitly
+            if 'no results' in text.lower() or '0 results' in text.lower():
+                print(f"Found explicit zero results indication: '{text}'")
+                return 0, True
+            print(f"Could not parse number from text: '{text}'")
+            return None, False
+    else:
+        print("Element with data-automation='resultsTotal' not found")
+        # Fallback: try to find any element containing "results"
+        elements = soup.find_all(string=RESULTS_PATTERN)
+        if elements:
+            for text in elements:
+                match = NUMBER_PATTERN.search(text)
+                if match:
+                    number_str = match.group(1).replace(',', '')
+                    result = int(number_str)
+                    print(f"Found results using fallback method: {result}")
+                    return result, True
+
+        # Check for explicit "no results" messages
+        no_results_elements = soup.find_all(string=NO_RESULTS_PATTERN)
+        if no_results_elements:
+            print("Found 'no results' indication")
+            return 0, True
+
+        return None, False
+
+
+def get_parse_executor() -> ProcessPoolExecutor:
+    """
+    Returns the process pool for the HTML fallback parse, starting it on first use.
+    Its workers come from a forkserver: forking this process directly could copy
+    a lock held by one of the fetching threads into the children.
+    """
+    global parse_executor
+    with parse_executor_lock:
+        if parse_executor is None:
+            parse_executor = ProcessPoolExecutor(
+                max_workers=PARSE_WORKERS,
+                mp_context=multiprocessing.get_context("forkserver"),
+            )
+    return parse_executor
 
 
 def parse_results_number(city_data: dict) -> tuple[Optional[int], bool]:
     """
     Filters out the number of results from the city data using data-automation='resultsTotal'.
-    
+
+    Args:
+        city_data: Spider API response for the city's results page
+
     Returns:
         tuple[Optional[int], bool]: (results_count, parsing_successful)
         - results_count: The number of results found, or None if not found/error
         - parsing_successful: True if parsing was successful (even if 0 results), False if error occurred
     """
-    from bs4 import BeautifulSoup
-    
     try:
-        content = city_data[0]['content']
-        # Check if content is already a string or needs decoding
-        if isinstance(content, str):
-            decoded = content
-        else:
-            # If it's a list of character codes, decode it
-            decoded = ''.join(chr(c) for c in content)
-        soup = BeautifulSoup(decoded, 'html.parser')
-        
-        # Find element with data-automation="resultsTotal"
-        element = soup.find(attrs={"data-automation": "resultsTotal"})
-
-        if element:
-            # Extract text and parse number
-            text = element.get_text(strip=True)
-            
-            # Use regex to extract numbers from text like "1,234 results" or "234 results"
-            match = re.search(r'([\d,]+)', text)
-            if match:
-                # Remove commas and convert to int
-                number_str = match.group(1).replace(',', '')
-                result = int(number_str)
-                return result, True
-            else:
-                # Check if the text indicates 0 results explicitly
-                if 'no results' in text.lower() or '0 results' in text.lower():
-                    print(f"Found explicit zero results indication: '{text}'")
-                    return 0, True
-                print(f"Could not parse number from text: '{text}'")
-                return None, False
-        else:
-            print("Element with data-automation='resultsTotal' not found")
-            # Fallback: try to find any element containing "results"
-            elements = soup.find_all(string=re.compile(r'\d+.*results', re.I))
-            if elements:
-                for text in elements:
-                    match = re.search(r'([\d,]+)', text)
-                    if match:
-                        number_str = match.group(1).replace(',', '')
-                        result = int(number_str)
-                        print(f"Found results using fallback method: {result}")
-                        return result, True
-            
-            # Check for explicit "no results" messages
-            no_results_elements = soup.find_all(string=re.compile(r'no.*results|0.*results', re.I))
-            if no_results_elements:
-                print("Found 'no results' indication")
-                return 0, True
-                
-            return None, False
-            
+        decoded = decode_content(city_data[0]['content'])
+
+        # Fast path: read the count straight from the markup without building a DOM
+        match = RESULTS_TOTAL_PATTERN.search(decoded)
+        if match:
+            return int(match.group(1).replace(',', '')), True
+
+        return get_parse_executor().submit(parse_results_from_html, decoded).result()
+
     except Exception as e:
         print(f"Error parsing results number: {e}")
         return None, False
@@ -108,7 +206,11 @@ def update_city_results_number(geoname_id: int, results: int) -> bool:
         "tripadvisor_restaurants_results": results,
     }
 
-    response = requests.patch(url, json=payload)
+    response = session.patch(
+        url,
+        data=orjson.dumps(payload),
+        headers={"Content-Type": "application/json"},
+    )
 
     if response.status_code == 200:
         return True
@@ -120,12 +222,28 @@ def update_city_results_number(geoname_id: int, results: int) -> bool:
         return False
 
 
-def process_city(city: Dict) -> Dict:
+def group_cities_by_geo_id(cities: List[Dict]) -> List[List[Dict]]:
     """
-    Process a single city: fetch data, parse results, update via API.
-    Returns a dictionary with the processing results.
+    Groups cities that share a tripadvisor_geo_id, dropping repeated geoname_ids.
+    Each group needs only one Spider API fetch. Cities without a geo ID get a
+    group of their own, so each is reported on by process_city.
     """
-    result = {
+    groups = {}
+    ungrouped = []
+    for city in cities:
+        tripadvisor_geo_id = city.get('tripadvisor_geo_id')
+        if not tripadvisor_geo_id:
+            ungrouped.append([city])
+            continue
+        group = groups.setdefault(tripadvisor_geo_id, {})
+        group.setdefault(city.get('geoname_id'), city)
+
+    return [list(group.values()) for group in groups.values()] + ungrouped
+
+
+def new_city_result(city: Dict) -> Dict:
+    """Returns the processing result of a city before anything is done."""
+    return {
         'city_name': city.get('name'),
         'geoname_id': city.get('geoname_id'),
         'success': False,
@@ -133,6 +251,27 @@ def process_city(city: Dict) -> Dict:
         'results_count': None
     }
 
+
+def city_group_results(result: Dict, duplicate_results: List[Dict]) -> List[Dict]:
+    """
+    Returns the results of a city and its duplicates. Duplicates that were
+    never updated failed along with the city and get its error.
+    """
+    for duplicate_result in duplicate_results:
+        if not duplicate_result['success'] and duplicate_result['error'] is None:
+            duplicate_result['error'] = result['error']
+    return [result] + duplicate_results
+
+
+def process_city(city: Dict, duplicates: Optional[List[Dict]] = None) -> List[Dict]:
+    """
+    Process a single city: fetch data, parse results, update via API.
+    Cities in duplicates share the same tripadvisor_geo_id and receive the same count.
+    Returns a list with the processing results of the city and of each duplicate.
+    """
+    result = new_city_result(city)
+    duplicate_results = [new_city_result(duplicate) for duplicate in duplicates or []]
+
     try:
         tripadvisor_geo_id = city.get("tripadvisor_geo_id")
         geoname_id = city.get("geoname_id")
@@ -141,19 +280,12 @@ def process_city(city: Dict) -> Dict:
         if (not tripadvisor_geo_id or not geoname_id):
             result['error'] = "Missing required data"
             print(f"Skipping city {city['name']} due to missing data.")
-            return result
+            return city_group_results(result, duplicate_results)
 
         print(f"[Thread] Analyzing city {city['name']}...")
 
         # Build TripAdvisor URL
-        tripadvisor_restaurants_url = (
-            "https://www.tripadvisor.com/FindRestaurants"
-            f"?geo={tripadvisor_geo_id}"
-            f"&establishmentTypes=10591,11776,12208,16548,16556,9900,9901,9909,21908"
-            f"&minimumTravelerRating=TRAVELER_RATING_LOW"
-            f"&broadened=false"
-            f"&offset=0"
-        )
+        tripadvisor_restaurants_url = RESTAURANTS_URL_TEMPLATE.format(tripadvisor_geo_id)
 
         # Fetch data from Spider API
         tripadvisor_city_data = client.request_spider_api(
@@ -164,7 +296,7 @@ def process_city(city: Dict) -> Dict:
             error_msg = tripadvisor_city_data.get('error', 'Unknown error')
             result['error'] = f"API fetch failed: {error_msg}"
             print(f"Failed to fetch data for {city['name']}: {error_msg}")
-            return result
+            return city_group_results(result, duplicate_results)
 
         # Parse results
         results, parsing_successful = parse_results_number(tripadvisor_city_data)
@@ -187,6 +319,18 @@ def process_city(city: Dict) -> Dict:
             else:
                 result['error'] = "Failed to update via API"
                 print(f"Failed to update {city['name']} results via API.")
+
+            for duplicate, duplicate_result in zip(duplicates or [], duplicate_results):
+                duplicate_result['results_count'] = results
+                if update_city_results_number(duplicate['geoname_id'], results):
+                    print(
+                        f"Successfully updated {duplicate.get('name')} "
+                        f"with {results} results (shared geo_id)."
+                    )
+                    duplicate_result['success'] = True
+                else:
+                    duplicate_result['error'] = "Failed to update via API"
+                    print(f"Failed to update {duplicate.get('name')} results via API.")
         else:
             # Parsing failed, don't update the database
             result['error'] = "Failed to parse results from scraped data"
@@ -199,7 +343,7 @@ def process_city(city: Dict) -> Dict:
         result['error'] = str(e)
         print(f"Error processing city {city.get('name', 'Unknown')}: {e}")
 
-    return result
+    return city_group_results(result, duplicate_results)
 
 
 def get_city_by_tripadvisor_geo_id(tripadvisor_geo_id: str) -> list:
@@ -210,9 +354,9 @@ def get_city_by_tripadvisor_geo_id(tripadvisor_geo_id: str) -> list:
         "&page_size=1"
     )
     
-    response = requests.get(url)
+    response = session.get(url)
     if response.status_code == 200:
-        data = response.json()
+        data = orjson.loads(response.content)
         if data and 'results' in data and len(data['results']) > 0:
             print(f"Found city: {data['results'][0]['name']} (geoname_id: {data['results'][0]['geoname_id']})")
             return data['results']
@@ -237,9 +381,9 @@ def get_zero_results_cities_with_url(country_code: Optional[str] = None) -> list
     if country_code:
         url += f"&country={country_code}"
     
-    response = requests.get(url)
+    response = session.get(url)
     if response.status_code == 200:
-        data = response.json()
+        data = orjson.loads(response.content)
         if data and 'results' in data:
             return data['results']
         else:
@@ -278,6 +422,12 @@ def main():
         type=str,
         help='Process only one specific tripadvisor_geo_id'
     )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=MAX_WORKERS,
+        help=f'Number of cities to process concurrently (default: {MAX_WORKERS})'
+    )
     
     args = parser.parse_args()
     
@@ -311,42 +461,53 @@ def main():
     
     print(f"Found {len(cities)} {mode_desc} to process.")
 
-    print(f"Starting concurrent processing of {len(cities)} cities...")
-    print("Processing with up to 10 concurrent threads...")
+    # Cities sharing a TripAdvisor page are fetched once and updated together
+    city_groups = group_cities_by_geo_id(cities)
+    if len(city_groups) < len(cities):
+        print(f"Deduplicated to {len(city_groups)} unique TripAdvisor geo IDs.")
+
+    print(f"Starting concurrent processing of {len(city_groups)} cities...")
+    print(f"Processing with up to {args.workers} concurrent threads...")
 
     # Process cities concurrently
     results = []
-    with ThreadPoolExecutor(max_workers=25) as executor:
+    # The fetching runs in threads; HTML fallback parses go to worker processes
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
         # Submit all tasks
-        future_to_city = {
-            executor.submit(process_city, city): city 
-            for city in cities
+        future_to_group = {
+            executor.submit(process_city, group[0], group[1:]): group
+            for group in city_groups
         }
 
+        # Every city of a group, duplicates included, gets its own result
+        total = sum(len(group) for group in city_groups)
+
         # Process completed tasks
-        for future in as_completed(future_to_city):
-            city = future_to_city[future]
+        for future in as_completed(future_to_group):
+            group = future_to_group[future]
             try:
-                result = future.result()
-                results.append(result)
+                results.extend(future.result())
                 
                 # Print progress
                 completed = len(results)
-                total = len(cities)
                 print(
                     f"Progress: {completed}/{total} cities processed "
                     f"({completed*100//total}%)"
                 )
                 
             except Exception as exc:
-                print(f"City {city.get('name', 'Unknown')} generated "
+                print(f"City {group[0].get('name', 'Unknown')} generated "
                       f"an exception: {exc}")
-                results.append({
-                    'city_name': city.get('name'),
-                    'geoname_id': city.get('geoname_id'),
-                    'success': False,
-                    'error': str(exc)
-                })
+                for city in group:
+                    results.append({
+                        'city_name': city.get('name'),
+                        'geoname_id': city.get('geoname_id'),
+                        'success': False,
+                        'error': str(exc)
+                    })
+
+    if parse_executor is not None:
+        parse_executor.shutdown()
 
     # Print summary
     print("\n" + "="*50)
@@ -1,8 +1,137 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
 import time
 import argparse
-import json
-from typing import List, Dict, Optional
+import hashlib
+import os
+import sys
+import ijson
+import orjson
+from loguru import logger
+from tqdm import tqdm
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+from operator import itemgetter
+from typing import Callable, FrozenSet, Iterable, Iterator, List, Dict, Optional, Set, Tuple
+from db import (
+    init_database,
+    analyze_database,
+    get_connection,
+    get_all_city_restaurant_urls,
+    write_city_restaurant_batch,
+)
+
+# Cities written to the local SQLite database per transaction
+SQLITE_COMMIT_EVERY = 500
+
+# TripAdvisor restaurant list URL for a geo ID, without the page offset
+RESTAURANTS_URL_TEMPLATE = (
+    "https://www.tripadvisor.com/FindRestaurants"
+    "?geo={}"
+    "&establishmentTypes=10591,11776,12208,16548,16556,9900,9901,9909,21908"
+    "&minimumTravelerRating=TRAVELER_RATING_LOW"
+    "&broadened=false"
+)
+
+# Fields a city needs before links can be generated for it; a positive
+# restaurant count is left to the min_restaurants=1 API filter, and the URL
+# helpers still treat a missing count as no restaurants
+REQUIRED_CITY_FIELDS = itemgetter('tripadvisor_geo_id', 'geoname_id')
+
+# A city looked up by geo ID is not filtered by the API, so it also needs a restaurant count
+SINGLE_CITY_FIELDS = itemgetter('tripadvisor_geo_id', 'tripadvisor_restaurants_results', 'geoname_id')
+
+# City fields this script reads; the API serializes only these
+CITY_FIELDS = "geoname_id,tripadvisor_geo_id,tripadvisor_restaurants_results,country_code,name"
+
+# Link rows buffered across cities before the SQLite writer inserts them
+SQLITE_BATCH_ROWS = 5000
+
+# City link batches buffered between URL generation and the SQLite writer
+SQLITE_QUEUE_SIZE = 1000
+
+# Concurrent requests used to fetch the remaining city pages
+PAGE_FETCH_WORKERS = 16
+
+# Parsed city lists kept between runs for --cache-ttl
+CACHE_DIR = "api_cache"
+
+# Links sent per request to the bulk endpoint
+BULK_CHUNK_SIZE = 500
+
+# Concurrent requests used to add or delete one city's links
+LINK_WORKERS = 16
+
+# Cities sent to the API at the same time
+CITY_WORKERS = 8
+
+# Keep-alive connections to the local API. Workers beyond this wait for an idle
+# connection instead of opening short-lived extra ones that the pool would discard.
+API_CONNECTIONS = 32
+
+# Keep-alive session shared by every local API call. Dropped connections, 429
+# and 5xx responses are retried by the adapter with exponential backoff.
+session = requests.Session()
+session.mount("http://", HTTPAdapter(
+    pool_maxsize=API_CONNECTIONS,
+    pool_block=True,
+    max_retries=Retry(
+        total=4,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=frozenset(["GET", "POST", "DELETE"]),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    ),
+))
+session.headers.update({"Accept": "application/json"})
+
+# Request bodies are serialized with orjson, so POSTs set their content type themselves
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Key holding the items of each list endpoint's responses ('' for a bare list),
+# detected from the endpoint's first response
+ITEMS_KEYS: Dict[str, str] = {}
+
+# Optional endpoints the API answered with 404/405. They are only probed once;
+# after that their callers go straight to the fallback.
+UNSUPPORTED_ENDPOINTS: Set[str] = set()
+
+
+def unpack_items(endpoint: str, data) -> List[Dict]:
+    """
+    Return the items of a list response. The response shape is only worked
+    out for an endpoint's first response and reused for every later one.
+    
+    Args:
+        endpoint: Name of the API endpoint the response came from
+        data: The parsed response
+    """
+    key = ITEMS_KEYS.get(endpoint)
+    
+    if key is None:
+        if isinstance(data, list):
+            key = ''
+        elif isinstance(data, dict) and 'results' in data:
+            key = 'results'
+        elif isinstance(data, dict) and 'items' in data:
+            key = 'items'
+        else:
+            return []
+        ITEMS_KEYS[endpoint] = key
+    
+    return data[key] if key else data
+
+
+def has_required_fields(city: Dict, fields: Callable[[Dict], Tuple] = REQUIRED_CITY_FIELDS) -> bool:
+    """Check that a city has a truthy value for every field picked by an itemgetter."""
+    try:
+        return all(fields(city))
+    except KeyError:
+        return False
 
 
 def fetch_single_city_by_tripadvisor_geo_id(tripadvisor_geo_id: int) -> Optional[Dict]:
@@ -15,220 +144,314 @@ def fetch_single_city_by_tripadvisor_geo_id(tripadvisor_geo_id: int) -> Optional
     Returns:
         City dict if found, None otherwise
     """
-    print(f"Fetching city with tripadvisor_geo_id: {tripadvisor_geo_id}")
+    logger.info(f"Fetching city with tripadvisor_geo_id: {tripadvisor_geo_id}")
     
     # Search for city with this tripadvisor_geo_id
     url = f"http://127.0.0.1:8000/api/cities/search/?tripadvisor_geo_id={tripadvisor_geo_id}"
     
     try:
-        response = requests.get(url)
+        response = session.get(url)
         if response.status_code == 200:
-            data = response.json()
-            
-            # Handle response structure
-            items = []
-            if isinstance(data, dict):
-                if 'results' in data:
-                    items = data.get('results', [])
-                elif 'items' in data:
-                    items = data.get('items', [])
-            elif isinstance(data, list):
-                items = data
+            items = unpack_items("cities/search", orjson.loads(response.content))
             
             if items and len(items) > 0:
                 city = items[0]  # Take the first match
                 # Validate city has required fields
-                if (city.get('tripadvisor_geo_id') and 
-                    city.get('tripadvisor_restaurants_results') and
-                    city.get('geoname_id')):
-                    print(f"Found city: {city.get('name', 'Unknown')} with {city.get('tripadvisor_restaurants_results')} restaurants")
+                if has_required_fields(city, SINGLE_CITY_FIELDS):
+                    logger.info(f"Found city: {city.get('name', 'Unknown')} with {city.get('tripadvisor_restaurants_results')} restaurants")
                     return city
                 else:
-                    print(f"City with tripadvisor_geo_id {tripadvisor_geo_id} is missing required fields")
+                    logger.info(f"City with tripadvisor_geo_id {tripadvisor_geo_id} is missing required fields")
                     return None
             else:
-                print(f"City with tripadvisor_geo_id {tripadvisor_geo_id} not found")
+                logger.info(f"City with tripadvisor_geo_id {tripadvisor_geo_id} not found")
                 return None
         else:
-            print(f"API error: {response.status_code} - {response.text}")
+            logger.error(f"API error: {response.status_code} - {response.text}")
             return None
     except Exception as e:
-        print(f"Error fetching city: {e}")
+        logger.error(f"Error fetching city: {e}")
         return None
 
 
-def fetch_all_cities(country_code: Optional[str] = None, blacklisted_countries: Optional[List[str]] = None) -> List[Dict]:
+def cities_page_url(page: int, page_size: int, country_code: Optional[str] = None,
+                    blacklisted_countries: Optional[FrozenSet[str]] = None) -> str:
+    """Build the API URL for one page of cities with restaurant data."""
+    url = (
+        f"http://127.0.0.1:8000/api/cities/search/"
+        f"?page={page}"
+        f"&page_size={page_size}"
+        f"&restaurants_is_null=false"
+        f"&min_restaurants=1"
+        f"&tripadvisor_geo_id_is_null=false"
+        f"&fields={CITY_FIELDS}"
+    )
+    
+    # Add country filter if specified
+    if country_code:
+        url += f"&country={country_code}"
+    
+    # Let the API leave out blacklisted countries instead of sending them to be discarded
+    if blacklisted_countries:
+        url += f"&country_not_in={','.join(sorted(blacklisted_countries))}"
+    
+    return url
+
+
+def fetch_cities_page(page: int, page_size: int, country_code: Optional[str] = None,
+                      blacklisted_countries: Optional[FrozenSet[str]] = None) -> Optional[Tuple[List[Dict], int, Optional[str]]]:
+    """
+    Fetch one page of cities with restaurant data.
+    
+    Args:
+        page: Page number to fetch (1-based)
+        page_size: Number of cities per page
+        country_code: Optional ISO 2-letter country code to filter cities
+        blacklisted_countries: Optional ISO 2-letter country codes to exclude
+        
+    Returns:
+        Tuple of (cities on the page, total city count reported by the API,
+        ijson prefix of the city items in the response), None on error
+    """
+    url = cities_page_url(page, page_size, country_code, blacklisted_countries)
+    
+    logger.debug(f"Fetching page {page} (page_size: {page_size})...")
+    
+    try:
+        response = session.get(url, timeout=30)
+        if response.status_code != 200:
+            logger.error(f"API error on page {page}: {response.status_code} - {response.text}")
+            return None
+        
+        data = orjson.loads(response.content)
+        
+        # Debug: print response structure for first page
+        if page == 1:
+            logger.debug(f"Response type: {type(data)}")
+            if isinstance(data, dict):
+                logger.debug(f"Response keys: {list(data.keys())}")
+                if len(data) > 0:
+                    # Show first few keys to understand structure
+                    for key, value in list(data.items())[:3]:
+                        logger.debug(f"  {key}: {type(value)}")
+        
+        # Handle different response structures
+        items = []
+        count = 0
+        items_path = None
+        
+        if isinstance(data, dict):
+            # Try common pagination field names
+            if 'items' in data:
+                items = data.get('items', [])
+                count = data.get('count', len(items))
+                items_path = 'items.item'
+            elif 'results' in data:
+                items = data.get('results', [])
+                count = data.get('count', len(items))
+                items_path = 'results.item'
+            elif 'data' in data:
+                items = data.get('data', [])
+                count = data.get('total', len(items))
+                items_path = 'data.item'
+            else:
+                # Check if the dict contains city data directly
+                # Look for common city fields to identify if this is city data
+                if any(key in data for key in ['geoname_id', 'name', 'tripadvisor_geo_id']):
+                    items = [data]  # Single city object
+                    count = 1
+                else:
+                    # Try to find a list value in the dict
+                    for key, value in data.items():
+                        if isinstance(value, list) and len(value) > 0:
+                            # Check if it looks like city data
+                            if isinstance(value[0], dict) and 'geoname_id' in value[0]:
+                                items = value
+                                count = data.get('count', len(items))
+                                items_path = f'{key}.item'
+                                break
+                
+        elif isinstance(data, list):
+            items = data
+            count = len(data)
+            items_path = 'item'
+        
+        return items, count, items_path
+        
+    except Exception as e:
+        logger.error(f"Error fetching cities page {page}: {e}")
+        return None
+
+
+def stream_cities_page(page: int, page_size: int, country_code: Optional[str],
+                       blacklisted_countries: Optional[FrozenSet[str]],
+                       items_path: str, keep: Callable[[Dict], bool]) -> Optional[List[Dict]]:
+    """
+    Fetch one page of cities, parsing the body as it arrives and keeping
+    only the cities that pass the filter.
+    
+    Args:
+        page: Page number to fetch (1-based)
+        page_size: Number of cities per page
+        country_code: Optional ISO 2-letter country code to filter cities
+        blacklisted_countries: Optional ISO 2-letter country codes to exclude
+        items_path: ijson prefix of the city items, as found on page 1
+        keep: Filter applied to every city while parsing
+        
+    Returns:
+        The kept cities on the page, None on error
+    """
+    url = cities_page_url(page, page_size, country_code, blacklisted_countries)
+    
+    logger.debug(f"Fetching page {page} (page_size: {page_size})...")
+    
+    try:
+        response = session.get(url, timeout=30, stream=True)
+    except Exception as e:
+        logger.error(f"Error fetching cities page {page}: {e}")
+        return None
+    
+    try:
+        if response.status_code != 200:
+            logger.error(f"API error on page {page}: {response.status_code} - {response.text}")
+            return None
+        
+        response.raw.decode_content = True
+        return [city for city in ijson.items(response.raw, items_path, use_float=True) if keep(city)]
+    except Exception as e:
+        logger.error(f"Error fetching cities page {page}: {e}")
+        return None
+    finally:
+        response.close()
+
+
+def fetch_all_cities(country_code: Optional[str] = None, blacklisted_countries: Optional[FrozenSet[str]] = None) -> Tuple[List[Dict], bool]:
     """
     Fetch all cities with restaurant data using Django Ninja pagination.
-    Uses page and page_size parameters until no more results are returned.
+    The first page reports the total count and response shape, after which
+    the remaining pages are fetched concurrently and filtered as they stream in.
     
     Args:
         country_code: Optional ISO 2-letter country code to filter cities (e.g., 'US', 'NL')
-        blacklisted_countries: Optional list of ISO 2-letter country codes to exclude
+        blacklisted_countries: Optional set of ISO 2-letter country codes to exclude
+        
+    Returns:
+        tuple: (cities, whether every page was fetched)
     """
-    all_cities = []
-    page = 1
     page_size = 1000
     
     if country_code:
-        print(f"Fetching cities with restaurant data for country: {country_code}")
+        logger.info(f"Fetching cities with restaurant data for country: {country_code}")
     else:
-        print("Fetching cities with restaurant data for all countries...")
+        logger.info("Fetching cities with restaurant data for all countries...")
     
     if blacklisted_countries:
-        print(f"Excluding countries: {', '.join(blacklisted_countries)}")
-    
-    while True:
-        url = (
-            f"http://127.0.0.1:8000/api/cities/search/"
-            f"?page={page}"
-            f"&page_size={page_size}"
-            f"&restaurants_is_null=false"
-            f"&tripadvisor_geo_id_is_null=false"
-        )
-        
-        # Add country filter if specified
-        if country_code:
-            url += f"&country={country_code}"
-        
-        print(f"Fetching page {page} (page_size: {page_size})...")
-        
-        try:
-            response = requests.get(url)
-            if response.status_code == 200:
-                data = response.json()
-                
-                # Debug: print response structure for first page
-                if page == 1:
-                    print(f"Response type: {type(data)}")
-                    if isinstance(data, dict):
-                        print(f"Response keys: {list(data.keys())}")
-                        if len(data) > 0:
-                            # Show first few keys to understand structure
-                            for key, value in list(data.items())[:3]:
-                                print(f"  {key}: {type(value)}")
-                
-                # Handle different response structures
-                items = []
-                count = 0
-                
-                if isinstance(data, dict):
-                    # Try common pagination field names
-                    if 'items' in data:
-                        items = data.get('items', [])
-                        count = data.get('count', len(items))
-                    elif 'results' in data:
-                        items = data.get('results', [])
-                        count = data.get('count', len(items))
-                    elif 'data' in data:
-                        items = data.get('data', [])
-                        count = data.get('total', len(items))
-                    else:
-                        # Check if the dict contains city data directly
-                        # Look for common city fields to identify if this is city data
-                        if any(key in data for key in ['geoname_id', 'name', 'tripadvisor_geo_id']):
-                            items = [data]  # Single city object
-                            count = 1
-                        else:
-                            # Try to find a list value in the dict
-                            for key, value in data.items():
-                                if isinstance(value, list) and len(value) > 0:
-                                    # Check if it looks like city data
-                                    if isinstance(value[0], dict) and 'geoname_id' in value[0]:
-                                        items = value
-                                        count = data.get('count', len(items))
-                                        break
-                        
-                elif isinstance(data, list):
-                    items = data
-                    count = len(data)
-                
-                if not items:
-                    print(f"No cities found on page {page}")
-                    break
-                
-                # Filter cities that have required data
-                valid_cities = []
-                for city in items:
-                    if (city.get('tripadvisor_geo_id') and 
-                        city.get('tripadvisor_restaurants_results') and
-                        city.get('geoname_id')):
-                        
-                        # Apply blacklist filter
-                        city_country = city.get('country_code')
-                        if blacklisted_countries and city_country in blacklisted_countries:
-                            continue  # Skip blacklisted countries
-                        
-                        valid_cities.append(city)
-                
-                if valid_cities:
-                    all_cities.extend(valid_cities)
-                    print(f"Found {len(valid_cities)} valid cities on page {page} "
-                          f"(total so far: {len(all_cities)})")
+        logger.info(f"Excluding countries: {', '.join(sorted(blacklisted_countries))}")
+    
+    first_page = fetch_cities_page(1, page_size, country_code, blacklisted_countries)
+    if first_page is None:
+        logger.info("Total cities fetched: 0")
+        return [], False
+    
+    items, count, items_path = first_page
+    
+    # Keep cities that have required data and are not in a blacklisted country.
+    # The API already excludes the blacklist, but older versions ignore country_not_in.
+    blacklist = blacklisted_countries or frozenset()
+    
+    def keep(city: Dict) -> bool:
+        return has_required_fields(city) and city.get('country_code') not in blacklist
+    
+    all_cities = [city for city in items if keep(city)]
+    
+    # The count on page 1 fixes the page range, so no request is spent
+    # probing for an empty page after the last one
+    total_pages = -(-count // page_size)
+    failed_pages = 0
+    
+    if not items:
+        logger.info("No cities found on page 1")
+    elif total_pages > 1 and items_path:
+        logger.info(f"Fetching pages 2-{total_pages} with up to {PAGE_FETCH_WORKERS} concurrent requests...")
+        with ThreadPoolExecutor(max_workers=PAGE_FETCH_WORKERS) as executor:
+            futures = [
+                executor.submit(stream_cities_page, page, page_size, country_code,
+                                blacklisted_countries, items_path, keep)
+                for page in range(2, total_pages + 1)
+            ]
+            # Collect in page order so the city order matches the API
+            for future in futures:
+                page_cities = future.result()
+                if page_cities is None:
+                    failed_pages += 1
                 else:
-                    print(f"No valid cities found on page {page}")
-                
-                # Check if we should continue to next page
-                if len(items) < page_size:
-                    print("Reached end of results (fewer items than page_size)")
-                    break
-                
-                # If we have count info, check if we've reached the end
-                if count > 0:
-                    total_pages = (count + page_size - 1) // page_size
-                    if page >= total_pages:
-                        print(f"Reached last page ({page}/{total_pages})")
-                        break
-                
-                page += 1
-                
-            else:
-                print(f"API error: {response.status_code} - {response.text}")
-                break
-                
-        except Exception as e:
-            print(f"Error fetching cities: {e}")
-            break
+                    all_cities.extend(page_cities)
     
-    print(f"Total cities fetched: {len(all_cities)}")
-    return all_cities
+    logger.info(f"Total cities fetched: {len(all_cities)}")
+    if failed_pages:
+        logger.warning(f"{failed_pages} of {total_pages} city pages could not be fetched")
+    return all_cities, not failed_pages
 
 
-def generate_restaurant_urls(city: Dict) -> List[str]:
+def load_cached_cities(cache_key: str, max_age: int) -> Optional[List[Dict]]:
     """
-    Generate all TripAdvisor restaurant URLs for a city.
-    Creates base URL and pagination URLs based on results count.
+    Load a city list saved by save_cached_cities.
+    
+    Args:
+        cache_key: Identifies the query the cities were fetched with
+        max_age: Maximum age of the cached list in seconds
+        
+    Returns:
+        The cached cities, None if there is no fresh copy
     """
-    geo_id = city.get('tripadvisor_geo_id')
-    results = city.get('tripadvisor_restaurants_results', 0)
+    cache_file = os.path.join(CACHE_DIR, f"{cache_key}.json")
+    
+    try:
+        if time.time() - os.path.getmtime(cache_file) > max_age:
+            return None
+        with open(cache_file, "rb") as f:
+            return orjson.loads(f.read())
+    except (OSError, orjson.JSONDecodeError):
+        return None
+
 
-    if not geo_id or results <= 0:
-        return []
+def save_cached_cities(cache_key: str, cities: List[Dict]) -> None:
+    """Save a fetched city list so later runs with the same query can skip the API."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(os.path.join(CACHE_DIR, f"{cache_key}.json"), "wb") as f:
+        f.write(orjson.dumps(cities))
 
-    # Calculate number of pages (30 results per page)
-    pages = results // 30 + (1 if results % 30 > 0 else 0)
 
-    base_url = (
-        "https://www.tripadvisor.com/FindRestaurants"
-        f"?geo={geo_id}"
-        f"&establishmentTypes=10591,11776,12208,16548,16556,9900,9901,9909,21908"
-        f"&minimumTravelerRating=TRAVELER_RATING_LOW"
-        f"&broadened=false")
+def count_restaurant_urls(geo_id: Optional[int], results: Optional[int]) -> int:
+    """Number of URLs iter_restaurant_urls yields for a city, without building them."""
+    if not geo_id or not results or results <= 0:
+        return 0
+    return -(-results // 30)
 
-    urls = [f"{base_url}&offset=0"]  # First page (no offset)
 
-    # Add paginated URLs
-    if pages > 1:
-        for i in range(1, pages):
-            paginated_url = f"{base_url}&offset={i * 30}"
-            urls.append(paginated_url)
+def iter_restaurant_urls(geo_id: Optional[int], results: Optional[int]) -> Iterator[str]:
+    """
+    Generate all TripAdvisor restaurant URLs for a city.
+    Creates base URL and pagination URLs based on results count.
+    
+    Args:
+        geo_id: The city's TripAdvisor geo ID
+        results: The city's TripAdvisor restaurant results count
+    """
+    if not geo_id or not results or results <= 0:
+        return
+
+    base_url = RESTAURANTS_URL_TEMPLATE.format(geo_id)
 
-    return urls
+    # One URL per page of 30 results, starting at offset 0
+    for offset in range(0, results, 30):
+        yield f"{base_url}&offset={offset}"
 
 
 def add_restaurant_link_via_api(geoname_id: int, url: str, status: str = "pending") -> bool:
     """
-    Add a restaurant link via the API with retry mechanism for network failures.
+    Add a restaurant link via the API. Network failures and 5xx responses
+    are retried by the session.
     
     Args:
         geoname_id: The geoname ID for the city
@@ -238,9 +461,6 @@ def add_restaurant_link_via_api(geoname_id: int, url: str, status: str = "pendin
     Returns:
         True if successfully added, False if already exists or error
     """
-    max_retries = 3
-    retry_delay = 1.0
-    
     payload = {
         "city_geoname_id": geoname_id,
         "link": url,
@@ -248,126 +468,206 @@ def add_restaurant_link_via_api(geoname_id: int, url: str, status: str = "pendin
     }
     
     api_url = "http://127.0.0.1:8000/api/restaurant-links/"
-    headers = {
-        "Content-Type": "application/json",
-        "Accept": "application/json"
-    }
     
-    for attempt in range(max_retries):
-        try:
-            response = requests.post(api_url, json=payload, headers=headers)
+    try:
+        response = session.post(api_url, data=orjson.dumps(payload), headers=JSON_HEADERS)
+        
+        if response.status_code in [200, 201]:
+            return True
+        elif response.status_code == 409 or response.status_code == 400:
+            # Conflict - URL already exists or validation error
+            try:
+                error_detail = orjson.loads(response.content)
+                if "already exists" in str(error_detail).lower() or "duplicate" in str(error_detail).lower():
+                    return False  # Already exists, not an error
+            except orjson.JSONDecodeError:
+                pass
+            return False
+        else:
+            # Other error
+            try:
+                error_detail = orjson.loads(response.content)
+                logger.error(f"API error {response.status_code}: {error_detail}")
+            except orjson.JSONDecodeError:
+                logger.error(f"API error {response.status_code}: {response.text[:200]}")
+            return False
             
-            if response.status_code in [200, 201]:
-                return True
-            elif response.status_code == 409 or response.status_code == 400:
-                # Conflict - URL already exists or validation error
-                try:
-                    error_detail = response.json()
-                    if "already exists" in str(error_detail).lower() or "duplicate" in str(error_detail).lower():
-                        return False  # Already exists, not an error
-                except json.JSONDecodeError:
-                    pass
-                return False
-            elif response.status_code >= 500 and attempt < max_retries - 1:
-                # Server error, retry
-                print(f"Server error ({response.status_code}), retrying in {retry_delay}s...")
-                time.sleep(retry_delay)
-                retry_delay *= 2
-                continue
-            else:
-                # Other error
-                try:
-                    error_detail = response.json()
-                    print(f"API error {response.status_code}: {error_detail}")
-                except json.JSONDecodeError:
-                    print(f"API error {response.status_code}: {response.text[:200]}")
-                return False
-                
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Network error adding restaurant link: {e}")
+        return False
+    except Exception as e:
+        logger.error(f"Error adding restaurant link: {e}")
+        return False
+
+
+def add_restaurant_links_bulk(geoname_id: int, urls: List[str], status: str = "pending") -> Optional[int]:
+    """
+    Add a city's restaurant links through the bulk endpoint in chunks of BULK_CHUNK_SIZE.
+    
+    Args:
+        geoname_id: The geoname ID for the city
+        urls: The TripAdvisor restaurant list URLs
+        status: Status of the links (pending, completed, in_progress)
+        
+    Returns:
+        Number of links created (existing links are skipped by the API),
+        or None if the API has no bulk endpoint
+    """
+    if "restaurant-links/bulk" in UNSUPPORTED_ENDPOINTS:
+        return None
+    
+    api_url = "http://127.0.0.1:8000/api/restaurant-links/bulk/"
+    created_count = 0
+    
+    for i in range(0, len(urls), BULK_CHUNK_SIZE):
+        chunk = urls[i:i + BULK_CHUNK_SIZE]
+        payload = {
+            "items": [
+                {"city_geoname_id": geoname_id, "link": url, "status": status}
+                for url in chunk
+            ]
+        }
+        
+        try:
+            response = session.post(api_url, data=orjson.dumps(payload), headers=JSON_HEADERS)
         except requests.exceptions.RequestException as e:
-            if attempt < max_retries - 1:
-                print(f"Network error, retrying in {retry_delay}s: {e}")
-                time.sleep(retry_delay)
-                retry_delay *= 2
-                continue
-            else:
-                print(f"Network error after {max_retries} attempts: {e}")
-                return False
-        except Exception as e:
-            print(f"Error adding restaurant link: {e}")
-            return False
+            logger.error(f"Network error bulk adding {len(chunk)} links: {e}")
+            continue
+        
+        if i == 0 and response.status_code in [404, 405]:
+            UNSUPPORTED_ENDPOINTS.add("restaurant-links/bulk")
+            return None
+        
+        if response.status_code in [200, 201]:
+            created_count += orjson.loads(response.content).get('created', 0)
+        else:
+            logger.error(f"Failed to bulk add {len(chunk)} links: {response.status_code}")
+    
+    return created_count
+
+
+def delete_restaurant_link(link_id: int) -> bool:
+    """
+    Delete a single restaurant link.
     
+    Returns:
+        True if the link was deleted, False otherwise
+    """
+    delete_url = f"http://127.0.0.1:8000/api/restaurant-links/{link_id}/"
+    try:
+        delete_response = session.delete(delete_url)
+        if delete_response.status_code in [200, 204]:
+            return True
+        logger.error(f"Failed to delete link {link_id}: {delete_response.status_code}")
+    except Exception as e:
+        logger.error(f"Error deleting link {link_id}: {e}")
     return False
 
 
-def remove_existing_restaurant_links(geoname_id: int) -> int:
+def fetch_restaurant_links_page(geoname_id: int, page: int, page_size: int) -> Optional[List[Dict]]:
+    """
+    Fetch one page of a city's restaurant links.
+    
+    Returns:
+        The links on the page, None on error
+    """
+    url = f"http://127.0.0.1:8000/api/restaurant-links/search/?city_geoname_id={geoname_id}&page={page}&page_size={page_size}"
+    
+    try:
+        response = session.get(url)
+        if response.status_code != 200:
+            logger.error(f"Error fetching restaurant links: {response.status_code}")
+            return None
+        
+        return unpack_items("restaurant-links/search", orjson.loads(response.content))
+        
+    except Exception as e:
+        logger.error(f"Error fetching restaurant links: {e}")
+        return None
+
+
+def bulk_delete_restaurant_links(geoname_id: int) -> Optional[int]:
+    """
+    Delete all restaurant links of a city with a single request.
+    
+    Returns:
+        Number of links deleted, or None if the API has no bulk delete
+    """
+    if "restaurant-links/delete" in UNSUPPORTED_ENDPOINTS:
+        return None
+    
+    url = f"http://127.0.0.1:8000/api/restaurant-links/?city_geoname_id={geoname_id}"
+    
+    try:
+        response = session.delete(url)
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Error bulk deleting restaurant links: {e}")
+        return None
+    
+    if response.status_code in [404, 405]:
+        UNSUPPORTED_ENDPOINTS.add("restaurant-links/delete")
+        return None
+    
+    if response.status_code == 204:
+        return 0
+    if response.status_code == 200:
+        return orjson.loads(response.content).get('deleted', 0)
+    
+    logger.error(f"Failed to bulk delete restaurant links: {response.status_code}")
+    return None
+
+
+def remove_existing_restaurant_links(geoname_id: int, legacy_delete: bool = False) -> int:
     """
     Remove all existing restaurant links for a city.
     This is needed when a city's tripadvisor_geo_id changes or when refreshing data.
     
     Args:
         geoname_id: The geoname ID of the city
+        legacy_delete: Skip the bulk delete and remove the links one by one
         
     Returns:
         Number of links deleted
     """
-    deleted_count = 0
-    page = 1
     page_size = 100
+    link_ids = []
+    
+    logger.debug(f"Removing existing restaurant links for geoname_id {geoname_id}...")
     
-    print(f"Removing existing restaurant links for geoname_id {geoname_id}...")
+    if not legacy_delete:
+        deleted_count = bulk_delete_restaurant_links(geoname_id)
+        if deleted_count is not None:
+            if deleted_count > 0:
+                logger.debug(f"Removed {deleted_count} existing restaurant links for geoname_id {geoname_id}")
+            return deleted_count
     
-    while True:
-        # Fetch links for this geoname_id
-        url = f"http://127.0.0.1:8000/api/restaurant-links/search/?city_geoname_id={geoname_id}&page={page}&page_size={page_size}"
+    with ThreadPoolExecutor(max_workers=LINK_WORKERS) as executor:
+        # List every link before deleting any, so the deletes can't shift later
+        # pages. The next page is always in flight while the current one arrives.
+        page = 1
+        current_page = executor.submit(fetch_restaurant_links_page, geoname_id, page, page_size)
+        next_page = executor.submit(fetch_restaurant_links_page, geoname_id, page + 1, page_size)
         
-        try:
-            response = requests.get(url)
-            if response.status_code == 200:
-                data = response.json()
-                
-                # Handle response structure
-                items = []
-                if isinstance(data, dict):
-                    if 'results' in data:
-                        items = data.get('results', [])
-                    elif 'items' in data:
-                        items = data.get('items', [])
-                elif isinstance(data, list):
-                    items = data
-                
-                if not items:
-                    break
-                
-                # Delete each link
-                for link in items:
-                    link_id = link.get('id')
-                    if link_id:
-                        delete_url = f"http://127.0.0.1:8000/api/restaurant-links/{link_id}/"
-                        try:
-                            delete_response = requests.delete(delete_url)
-                            if delete_response.status_code in [200, 204]:
-                                deleted_count += 1
-                            else:
-                                print(f"Failed to delete link {link_id}: {delete_response.status_code}")
-                        except Exception as e:
-                            print(f"Error deleting link {link_id}: {e}")
-                
-                # Check if we should continue to next page
-                if len(items) < page_size:
-                    break
-                    
-                page += 1
-                
-            else:
-                print(f"Error fetching restaurant links: {response.status_code}")
+        while True:
+            items = current_page.result()
+            if not items:
                 break
-                
-        except Exception as e:
-            print(f"Error removing restaurant links: {e}")
-            break
+            
+            link_ids.extend(link.get('id') for link in items if link.get('id'))
+            
+            # Check if we should continue to next page
+            if len(items) < page_size:
+                break
+            
+            page += 1
+            current_page = next_page
+            next_page = executor.submit(fetch_restaurant_links_page, geoname_id, page + 1, page_size)
+        
+        # Delete the links concurrently
+        deleted_count = sum(executor.map(delete_restaurant_link, link_ids))
     
     if deleted_count > 0:
-        print(f"Removed {deleted_count} existing restaurant links for geoname_id {geoname_id}")
+        logger.debug(f"Removed {deleted_count} existing restaurant links for geoname_id {geoname_id}")
     
     return deleted_count
 
@@ -382,21 +682,207 @@ def add_urls_to_database(city: Dict, urls: List[str]) -> int:
     
     geoname_id = city.get('geoname_id')
     city_name = city.get('name', 'Unknown')
-    added_count = 0
     
-    for url in urls:
-        if add_restaurant_link_via_api(geoname_id, url, "pending"):
-            added_count += 1
+    added_count = add_restaurant_links_bulk(geoname_id, urls, "pending")
+    
+    if added_count is None:
+        # No bulk endpoint; the links are independent, so post them concurrently
+        with ThreadPoolExecutor(max_workers=LINK_WORKERS) as executor:
+            added_count = sum(
+                executor.map(partial(add_restaurant_link_via_api, geoname_id, status="pending"), urls)
+            )
     
     if added_count > 0:
-        print(f"Added {added_count}/{len(urls)} URLs for {city_name}")
+        logger.debug(f"Added {added_count}/{len(urls)} URLs for {city_name}")
     else:
-        print(f"No new URLs added for {city_name} "
+        logger.debug(f"No new URLs added for {city_name} "
               f"(all {len(urls)} already exist)")
     
     return added_count
 
 
+def replace_restaurant_links(geoname_id: int, urls: List[str]) -> Optional[int]:
+    """
+    Replace all restaurant links of a city in one request, which the API
+    applies in a single transaction.
+    
+    Returns:
+        Number of links added, or None if the API has no replace endpoint
+    """
+    if "restaurant-links/replace" in UNSUPPORTED_ENDPOINTS:
+        return None
+    
+    api_url = f"http://127.0.0.1:8000/api/cities/{geoname_id}/restaurant-links/replace/"
+    
+    try:
+        response = session.post(api_url, data=orjson.dumps({"urls": urls}), headers=JSON_HEADERS)
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Error replacing restaurant links: {e}")
+        return None
+    
+    if response.status_code in [404, 405]:
+        UNSUPPORTED_ENDPOINTS.add("restaurant-links/replace")
+        return None
+    
+    if response.status_code in [200, 201]:
+        result = orjson.loads(response.content)
+        logger.debug(f"Replaced links for geoname_id {geoname_id}: "
+                     f"{result.get('removed', 0)} removed, {result.get('added', 0)} added, "
+                     f"{result.get('duplicates', 0)} duplicates")
+        return result.get('added', 0)
+    
+    logger.error(f"Failed to replace restaurant links: {response.status_code}")
+    return None
+
+
+def url_set_hash(urls: List[str]) -> str:
+    """Hash a set of URLs the way the API hashes a city's stored links."""
+    return hashlib.sha256("\n".join(sorted(set(urls))).encode()).hexdigest()
+
+
+def fetch_restaurant_links_hash(geoname_id: int) -> Optional[str]:
+    """
+    Fetch the hash of a city's stored restaurant links.
+    
+    Returns:
+        SHA-256 of the sorted stored URLs, or None if the API has no hash endpoint
+    """
+    if "restaurant-links/hash" in UNSUPPORTED_ENDPOINTS:
+        return None
+    
+    api_url = f"http://127.0.0.1:8000/api/cities/{geoname_id}/restaurant-links/hash/"
+    
+    try:
+        response = session.get(api_url, timeout=30)
+    except requests.exceptions.RequestException as e:
+        logger.debug(f"Error fetching restaurant links hash: {e}")
+        return None
+    
+    if response.status_code in [404, 405]:
+        UNSUPPORTED_ENDPOINTS.add("restaurant-links/hash")
+        return None
+    if response.status_code != 200:
+        return None
+    
+    return orjson.loads(response.content).get('sha256')
+
+
+def store_city_links_via_api(city: Dict, urls: Iterable[str], clean: bool, legacy_delete: bool = False) -> int:
+    """
+    Store a city's URLs through the API, first removing its old links if clean is set.
+    Uses the single-request replace endpoint when available. A city whose stored
+    links already match its URLs is left alone, so its link statuses are kept.
+    
+    Returns:
+        Number of links added
+    """
+    geoname_id = city.get('geoname_id')
+    
+    # The URL list is built here, so only the cities being stored hold one
+    urls = list(urls)
+    
+    if geoname_id and urls and fetch_restaurant_links_hash(geoname_id) == url_set_hash(urls):
+        logger.debug(f"Links of {city.get('name', 'Unknown')} are unchanged, skipping")
+        return 0
+    
+    if geoname_id and clean:
+        if not legacy_delete:
+            added_count = replace_restaurant_links(geoname_id, urls)
+            if added_count is not None:
+                return added_count
+        
+        removed_count = remove_existing_restaurant_links(geoname_id, legacy_delete)
+        if removed_count > 0:
+            logger.debug(f"Cleaned up {removed_count} old links before adding new ones")
+    
+    return add_urls_to_database(city, urls)
+
+
+def write_links_to_sqlite(write_queue: queue.Queue, clean: bool, totals: Dict[str, int]) -> None:
+    """
+    Write the links queued by main() to the local SQLite database.
+    Runs on its own thread and owns the only write connection, so URL
+    generation never waits on a commit. Rows from consecutive cities are
+    buffered and written SQLITE_BATCH_ROWS at a time. A None item ends the loop.
+    
+    Args:
+        write_queue: Queue of (city, URL iterable) tuples
+        clean: Remove each city's existing links before adding the new ones
+        totals: Updated in place with the number of URLs 'added', and the
+            'error' that stopped the writer, if any
+    """
+    # All cities share one transaction, committed every SQLITE_COMMIT_EVERY cities.
+    # If the run dies the uncommitted batch is rolled back when the connection goes away.
+    db_conn = get_connection()
+    queue_done = False
+    
+    try:
+        # Without cleaning, most URLs of a rerun are already stored, so load them
+        # once and skip them in memory instead of one index lookup per insert
+        existing_urls = None
+        if not clean:
+            existing_urls = get_all_city_restaurant_urls(db_conn)
+            logger.info(f"Loaded {len(existing_urls)} existing URLs from the local database")
+        
+        clear_geoname_ids = []
+        rows = []
+        buffered_cities = 0
+        uncommitted_cities = 0
+        
+        while True:
+            item = write_queue.get()
+            queue_done = item is None
+            
+            if item is not None:
+                city, urls = item
+                geoname_id = city.get('geoname_id')
+                
+                if geoname_id and clean:
+                    clear_geoname_ids.append(geoname_id)
+                
+                if existing_urls is not None:
+                    urls = [url for url in urls if url not in existing_urls]
+                    existing_urls.update(urls)
+                
+                rows.extend((geoname_id, url, "pending") for url in urls)
+                buffered_cities += 1
+            
+            # A batch replaces its cities' old rows first, then inserts all new ones
+            if buffered_cities and (item is None or len(rows) >= SQLITE_BATCH_ROWS):
+                removed_count, added_count = write_city_restaurant_batch(
+                    db_conn, clear_geoname_ids, rows
+                )
+                totals['added'] += added_count
+                logger.debug(f"Wrote {added_count} new URLs for {buffered_cities} cities "
+                      f"to the local database (removed {removed_count} old links)")
+                
+                uncommitted_cities += buffered_cities
+                if uncommitted_cities >= SQLITE_COMMIT_EVERY:
+                    db_conn.commit()
+                    uncommitted_cities = 0
+                
+                clear_geoname_ids.clear()
+                rows.clear()
+                buffered_cities = 0
+            
+            if item is None:
+                break
+        
+        analyze_database(db_conn)
+        db_conn.commit()
+        
+    except Exception as e:
+        logger.error(f"Error writing links to the local database: {e}")
+        totals['error'] = str(e)
+        # Keep draining so main() is never blocked on a full queue, unless
+        # main() already sent its last item
+        if not queue_done:
+            while write_queue.get() is not None:
+                pass
+    finally:
+        db_conn.close()
+
+
 def main():
     """Main function to create restaurant links via API."""
     # Parse command line arguments
@@ -439,112 +925,202 @@ def main():
         dest='clean',
         help='Do not clean old restaurant links before adding new ones'
     )
+    parser.add_argument(
+        '--legacy-delete',
+        action='store_true',
+        help='Delete old restaurant links one by one instead of with a single bulk request'
+    )
+    parser.add_argument(
+        '--cache-ttl',
+        type=int,
+        default=0,
+        help='Reuse the city list of an identical earlier run if it is at most this many seconds old (default: 0, disabled)'
+    )
+    parser.add_argument(
+        '--verbose', '-v',
+        action='store_true',
+        help='Print per-city and per-page details'
+    )
+    parser.add_argument(
+        '--sqlite',
+        action='store_true',
+        help='Write links to the local SQLite database read by 3_scrape_city_restaurant_urls.py instead of the API'
+    )
     
     args = parser.parse_args()
+    
+    # Per-city and per-page details are debug output, shown with --verbose.
+    # Log lines go through tqdm so they don't break the progress bar, and are
+    # written by loguru's own thread so workers never wait on the terminal.
+    logger.remove()
+    logger.add(
+        lambda message: tqdm.write(message, end=""),
+        format="{message}",
+        level="DEBUG" if args.verbose else "INFO",
+        enqueue=True,
+    )
     country = args.country.upper() if args.country and not args.geo_id else None
     
-    # Parse blacklist
+    # Parse blacklist into a set, as it is checked once per fetched city
     blacklisted_countries = None
     if args.blacklist and not args.geo_id:
-        blacklisted_countries = [c.strip().upper() for c in args.blacklist.split(',')]
+        blacklisted_countries = frozenset(c.strip().upper() for c in args.blacklist.split(','))
     
-    print("=" * 60)
-    print("CREATING RESTAURANT LINKS VIA API")
-    print("=" * 60)
+    logger.info("=" * 60)
+    logger.info("CREATING RESTAURANT LINKS VIA API")
+    logger.info("=" * 60)
     
     if args.geo_id:
-        print(f"Target: Single TripAdvisor geo_id {args.geo_id}")
+        logger.info(f"Target: Single TripAdvisor geo_id {args.geo_id}")
     elif country:
-        print(f"Target country: {country}")
+        logger.info(f"Target country: {country}")
     else:
-        print("Target: All countries")
+        logger.info("Target: All countries")
     
     if blacklisted_countries:
-        print(f"Blacklisted countries: {', '.join(blacklisted_countries)}")
+        logger.info(f"Blacklisted countries: {', '.join(sorted(blacklisted_countries))}")
     
     if args.limit and not args.geo_id:
-        print(f"City limit: {args.limit}")
+        logger.info(f"City limit: {args.limit}")
     
     if args.clean:
-        print("Clean mode: ENABLED (will remove old links before adding new ones)")
+        logger.info("Clean mode: ENABLED (will remove old links before adding new ones)")
     else:
-        print("Clean mode: DISABLED (old links will be kept)")
+        logger.info("Clean mode: DISABLED (old links will be kept)")
     
-    # No database initialization needed - using API
+    if args.sqlite:
+        logger.info("Storage: local SQLite database")
+        init_database()
     
-    # Fetch cities
+    # Fetch cities, from the local cache when a recent enough copy exists
     if args.geo_id:
-        # Fetch single city by tripadvisor_geo_id
-        city = fetch_single_city_by_tripadvisor_geo_id(args.geo_id)
-        cities = [city] if city else []
+        cache_key = f"geo_{args.geo_id}"
     else:
-        # Fetch all cities based on filters
-        cities = fetch_all_cities(country, blacklisted_countries)
+        cache_key = f"cities_{country or 'all'}_{'-'.join(sorted(blacklisted_countries or ()))}"
+    
+    cities = load_cached_cities(cache_key, args.cache_ttl) if args.cache_ttl > 0 else None
+    
+    if cities is not None:
+        logger.info(f"Loaded {len(cities)} cities from the local cache")
+    else:
+        if args.geo_id:
+            # Fetch single city by tripadvisor_geo_id
+            city = fetch_single_city_by_tripadvisor_geo_id(args.geo_id)
+            cities = [city] if city else []
+            complete = True
+        else:
+            # Fetch all cities based on filters
+            cities, complete = fetch_all_cities(country, blacklisted_countries)
+        
+        # A list missing failed pages would pass for the full one on later runs
+        if cities and complete and args.cache_ttl > 0:
+            save_cached_cities(cache_key, cities)
     
     if not cities:
-        print("No cities found to process.")
+        logger.info("No cities found to process.")
         return
     
     # Apply limit if specified (not for single geo_id)
     if args.limit and not args.geo_id and len(cities) > args.limit:
         cities = cities[:args.limit]
-        print(f"Limited to first {args.limit} cities")
+        logger.info(f"Limited to first {args.limit} cities")
     
-    print(f"\nProcessing {len(cities)} cities...")
+    logger.info(f"\nProcessing {len(cities)} cities...")
     
     # Process each city
     total_urls_generated = 0
     total_urls_added = 0
     cities_processed = 0
     
-    for i, city in enumerate(cities, 1):
-        city_name = city.get('name', 'Unknown')
-        results_count = city.get('tripadvisor_restaurants_results', 0)
-        geoname_id = city.get('geoname_id')
-        
-        print(f"\n[{i}/{len(cities)}] Processing {city_name} "
-              f"({results_count} results)...")
-        
-        # First remove any existing links for this city (if cleaning is enabled)
-        if geoname_id and args.clean:
-            removed_count = remove_existing_restaurant_links(geoname_id)
-            if removed_count > 0:
-                print(f"Cleaned up {removed_count} old links before adding new ones")
-        
-        # Generate URLs
-        urls = generate_restaurant_urls(city)
-        total_urls_generated += len(urls)
-        
-        if urls:
-            # Add to database
-            added_count = add_urls_to_database(city, urls)
-            total_urls_added += added_count
-            cities_processed += 1
-        else:
-            print(f"No URLs generated for {city_name}")
+    writer = None
+    if args.sqlite:
+        # SQLite writes run on their own thread while this one generates URLs
+        write_queue = queue.Queue(maxsize=SQLITE_QUEUE_SIZE)
+        sqlite_totals = {'added': 0, 'error': None}
+        writer = threading.Thread(
+            target=write_links_to_sqlite,
+            args=(write_queue, args.clean, sqlite_totals),
+            daemon=True,
+        )
+        writer.start()
+    
+    progress = tqdm(total=len(cities), desc="Cities", unit="city")
+    
+    # Cities are independent, so up to CITY_WORKERS of them talk to the API at once
+    with ThreadPoolExecutor(max_workers=CITY_WORKERS) as executor:
+        future_to_city = {}
+        
+        for i, city in enumerate(cities, 1):
+            city_name = city.get('name', 'Unknown')
+            results_count = city.get('tripadvisor_restaurants_results', 0)
+            
+            logger.debug(f"[{i}/{len(cities)}] Processing {city_name} "
+                         f"({results_count} results)...")
+            
+            # URLs are generated lazily by whoever stores them
+            geo_id = city.get('tripadvisor_geo_id')
+            urls = iter_restaurant_urls(geo_id, results_count)
+            url_count = count_restaurant_urls(geo_id, results_count)
+            total_urls_generated += url_count
+            
+            if url_count:
+                cities_processed += 1
+            else:
+                logger.debug(f"No URLs generated for {city_name}")
+            
+            # Cities are also cleaned when they no longer generate any URLs
+            if writer is not None:
+                write_queue.put((city, urls))
+                progress.update()
+                # Progress update every 50 cities
+                if i % 50 == 0:
+                    progress.set_postfix(generated=total_urls_generated, added=sqlite_totals['added'])
+            else:
+                future = executor.submit(
+                    store_city_links_via_api, city, urls, args.clean, args.legacy_delete
+                )
+                future_to_city[future] = city
+        
+        for future in as_completed(future_to_city):
+            try:
+                total_urls_added += future.result()
+            except Exception as exc:
+                city = future_to_city[future]
+                logger.error(f"City {city.get('name', 'Unknown')} generated an exception: {exc}")
+            
+            progress.update()
+            # Progress update every 50 cities
+            if progress.n % 50 == 0:
+                progress.set_postfix(generated=total_urls_generated, added=total_urls_added)
+    
+    progress.close()
+    
+    if writer is not None:
+        write_queue.put(None)
+        writer.join()
+        total_urls_added = sqlite_totals['added']
         
-        # Progress update every 50 cities
-        if i % 50 == 0:
-            print(f"\nProgress: {i}/{len(cities)} cities processed "
-                  f"({i*100//len(cities)}%)")
-            print(f"URLs generated: {total_urls_generated}, "
-                  f"URLs added: {total_urls_added}")
+        if sqlite_totals['error']:
+            logger.error(f"Writing to the local database failed: {sqlite_totals['error']}")
+            logger.complete()
+            sys.exit(1)
     
     # Final summary
-    print("\n" + "=" * 60)
-    print("PROCESSING SUMMARY")
-    print("=" * 60)
-    print(f"Total cities fetched from API: {len(cities)}")
-    print(f"Cities with URLs generated: {cities_processed}")
-    print(f"Total URLs generated: {total_urls_generated}")
-    print(f"Total URLs added to database: {total_urls_added}")
-    print(f"URLs already existed: {total_urls_generated - total_urls_added}")
+    logger.info("\n" + "=" * 60)
+    logger.info("PROCESSING SUMMARY")
+    logger.info("=" * 60)
+    logger.info(f"Total cities fetched from API: {len(cities)}")
+    logger.info(f"Cities with URLs generated: {cities_processed}")
+    logger.info(f"Total URLs generated: {total_urls_generated}")
+    logger.info(f"Total URLs added to database: {total_urls_added}")
+    logger.info(f"URLs already existed: {total_urls_generated - total_urls_added}")
     
     if cities_processed > 0:
         avg_urls_per_city = total_urls_generated / cities_processed
-        print(f"Average URLs per city: {avg_urls_per_city:.1f}")
+        logger.info(f"Average URLs per city: {avg_urls_per_city:.1f}")
     
-    print("\nAPI link creation completed successfully!")
+    logger.info("\nAPI link creation completed successfully!")
+    logger.complete()
 
 
 if __name__ == "__main__":
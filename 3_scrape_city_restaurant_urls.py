@@ -1,20 +1,99 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
 import dotenv
-import json
+import orjson
+from loguru import logger
 import argparse
+import atexit
+import heapq
+import os
+import queue
+import re
+import sys
+import threading
 import time
 from datetime import datetime
-from typing import List, Tuple, Dict
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from db import get_city_restaurant_urls_with_status, remove_city_restaurant_url
+from urllib.parse import parse_qsl, urlsplit
+from typing import FrozenSet, List, Optional, Tuple, Dict
+from collections import Counter
+from dataclasses import dataclass
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from db import get_city_restaurant_urls_with_status, remove_city_restaurant_urls
 from spider_cloud import SpiderAPI
 
-client = SpiderAPI()
-
 dotenv.load_dotenv()
 
 DATABASE_FILE = "city_restaurant_links.db"
 
+# City pages requested from the local API at the same time
+PAGE_FETCH_WORKERS = 8
+
+# Default number of URLs scraped through the Spider API at the same time.
+# The work is I/O-bound, so this is well above the CPU count. Hosts sharing
+# the Spider API account can set SCRAPER_WORKERS in the environment instead.
+SCRAPER_WORKERS = int(os.getenv("SCRAPER_WORKERS", min(64, (os.cpu_count() or 4) * 4)))
+
+client = SpiderAPI(pool_maxsize=SCRAPER_WORKERS)
+
+# Scraped URLs are removed from the database in batches of this size
+REMOVE_BATCH_SIZE = 100
+
+# URLs submitted to the pool per worker at a time; the rest wait their turn
+IN_FLIGHT_PER_WORKER = 2
+
+# Continuous mode waits IDLE_BASE_SLEEP seconds after an iteration that removed no
+# URLs, doubling for every further such iteration up to IDLE_MAX_SLEEP
+IDLE_BASE_SLEEP = 5
+IDLE_MAX_SLEEP = 300
+
+# Attempts per list page URL; retry n waits 2 * (n - 1) seconds without holding a worker
+MAX_URL_ATTEMPTS = 3
+
+# Common CAPTCHA indicators, matched case-insensitively in one pass over the page
+CAPTCHA_PATTERN = re.compile(
+    r'captcha|recaptcha|challenge|verify|robot|human verification|security check|access denied',
+    re.IGNORECASE,
+)
+
+# CAPTCHA pages give themselves away at the top, so only this much of the content is scanned
+CAPTCHA_SCAN_CHARS = 64 * 1024
+
+# Geo ID in a TripAdvisor URL, e.g. .../Restaurant_Review-g188590-d123-...
+GEO_ID_PATTERN = re.compile(r'-g(\d+)-')
+
+def local_api_adapter(pool_maxsize: int) -> HTTPAdapter:
+    """
+    Adapter for the local API with a connection for each of pool_maxsize workers.
+    Dropped connections, 429 and 5xx responses are retried with exponential backoff.
+    """
+    return HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=pool_maxsize,
+        max_retries=Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=[429, 500, 502, 503, 504],
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        ),
+    )
+
+
+# Keep-alive session shared by every local API call
+session = requests.Session()
+session.mount("http://", local_api_adapter(SCRAPER_WORKERS))
+
+# Headers of the restaurant POSTs, whose bodies are serialized with orjson
+JSON_HEADERS = {
+    "Content-Type": "application/json",
+    "Accept": "application/json",
+}
+
+# Set once the API answers the bulk restaurants endpoint with 404/405, after
+# which every page goes straight to the one-request-per-restaurant fallback
+bulk_endpoint_unsupported = False
+
 
 def get_geoname_id_from_tripadvisor_geo_id(tripadvisor_geo_id: int) -> int:
     """
@@ -26,14 +105,14 @@ def get_geoname_id_from_tripadvisor_geo_id(tripadvisor_geo_id: int) -> int:
     Returns:
         The corresponding geoname_id if found, None otherwise
     """
-    print(f"Looking up geoname_id for tripadvisor_geo_id: {tripadvisor_geo_id}")
+    logger.info(f"Looking up geoname_id for tripadvisor_geo_id: {tripadvisor_geo_id}")
     
     url = f"http://127.0.0.1:8000/api/cities/search/?tripadvisor_geo_id={tripadvisor_geo_id}"
     
     try:
-        response = requests.get(url)
+        response = session.get(url, timeout=30)
         if response.status_code == 200:
-            data = response.json()
+            data = orjson.loads(response.content)
             
             # Handle response structure
             items = []
@@ -52,199 +131,205 @@ def get_geoname_id_from_tripadvisor_geo_id(tripadvisor_geo_id: int) -> int:
                 restaurants_count = city.get('tripadvisor_restaurants_results', 0)
                 
                 if geoname_id:
-                    print(f"Found city: {city_name} (geoname_id: {geoname_id}) with {restaurants_count} restaurants")
+                    logger.info(f"Found city: {city_name} (geoname_id: {geoname_id}) with {restaurants_count} restaurants")
                     return geoname_id
                 else:
-                    print(f"City found but missing geoname_id")
+                    logger.warning(f"City found but missing geoname_id")
                     return None
             else:
-                print(f"No city found with tripadvisor_geo_id {tripadvisor_geo_id}")
+                logger.warning(f"No city found with tripadvisor_geo_id {tripadvisor_geo_id}")
                 return None
         else:
-            print(f"API error: {response.status_code}")
+            logger.error(f"API error: {response.status_code}")
             return None
     except Exception as e:
-        print(f"Error looking up city: {e}")
+        logger.error(f"Error looking up city: {e}")
         return None
 
 
-def get_tripadvisor_geo_ids_by_country(country_code: str) -> List[str]:
+def fetch_country_cities_page(country_code: str, page: int, page_size: int) -> Optional[Tuple[List[Dict], int]]:
     """
-    Get all TripAdvisor geo IDs for cities in a specific country.
+    Fetch one page of cities with a TripAdvisor geo ID in a specific country.
     
     Args:
         country_code: ISO 2-letter country code (e.g., 'US', 'FR', 'DE')
+        page: Page number to fetch (1-based)
+        page_size: Number of cities per page
         
     Returns:
-        List of TripAdvisor geo IDs as strings
+        Tuple of (cities on the page, total city count reported by the API), None on error
     """
-    all_geo_ids = []
-    page = 1
-    page_size = 100
-    
-    print(f"Fetching TripAdvisor geo IDs for country code: {country_code}")
+    url = (
+        f"http://127.0.0.1:8000/api/cities/search/"
+        f"?page={page}"
+        f"&page_size={page_size}"
+        f"&country={country_code}"
+        f"&tripadvisor_geo_id_is_null=false"
+    )
     
-    while True:
-        url = (
-            f"http://127.0.0.1:8000/api/cities/search/"
-            f"?page={page}"
-            f"&page_size={page_size}"
-            f"&country={country_code}"
-            f"&tripadvisor_geo_id_is_null=false"
-        )
+    try:
+        response = session.get(url, timeout=30)
+        if response.status_code != 200:
+            logger.error(f"API error on page {page}: {response.status_code} - {response.text}")
+            return None
         
-        try:
-            response = requests.get(url)
-            if response.status_code == 200:
-                data = response.json()
-                
-                # Handle different response structures
-                items = []
-                if isinstance(data, dict):
-                    if 'items' in data:
-                        items = data.get('items', [])
-                    elif 'results' in data:
-                        items = data.get('results', [])
-                    elif 'data' in data:
-                        items = data.get('data', [])
-                elif isinstance(data, list):
-                    items = data
-                
-                if not items:
-                    break
-                
-                # Extract TripAdvisor geo IDs
-                for city in items:
-                    tripadvisor_geo_id = city.get('tripadvisor_geo_id')
-                    if tripadvisor_geo_id:
-                        all_geo_ids.append(str(tripadvisor_geo_id))
-                
-                # Check if we should continue to next page
-                if len(items) < page_size:
-                    break
-                
-                page += 1
-                
+        data = orjson.loads(response.content)
+        
+        # Handle different response structures
+        items = []
+        count = 0
+        
+        if isinstance(data, dict):
+            # Try common pagination field names
+            if 'items' in data:
+                items = data.get('items', [])
+                count = data.get('count', len(items))
+            elif 'results' in data:
+                items = data.get('results', [])
+                count = data.get('count', len(items))
+            elif 'data' in data:
+                items = data.get('data', [])
+                count = data.get('total', len(items))
             else:
-                print(f"API error: {response.status_code}")
-                break
+                # Try to find a list value in the dict
+                for key, value in data.items():
+                    if isinstance(value, list) and len(value) > 0:
+                        # Check if it looks like city data
+                        if isinstance(value[0], dict) and 'geoname_id' in value[0]:
+                            items = value
+                            count = data.get('count', len(items))
+                            break
                 
-        except Exception as e:
-            print(f"Error fetching TripAdvisor geo IDs: {e}")
-            break
-    
-    print(f"Total TripAdvisor geo IDs found for {country_code}: {len(all_geo_ids)}")
-    return all_geo_ids
+        elif isinstance(data, list):
+            items = data
+            count = len(data)
+        
+        return items, count
+        
+    except Exception as e:
+        logger.error(f"Error fetching cities page {page}: {e}")
+        return None
 
 
-def get_geoname_ids_by_country(country_code: str) -> List[int]:
+def fetch_country_cities(country_code: str) -> List[Dict]:
     """
-    Get all geoname_ids for cities in a specific country that have TripAdvisor restaurant data.
+    Fetch all cities with a TripAdvisor geo ID in a specific country.
+    The first page reports the total count, after which the remaining
+    pages are fetched concurrently.
     
     Args:
         country_code: ISO 2-letter country code (e.g., 'US', 'FR', 'DE')
         
     Returns:
-        List of geoname_ids for cities with tripadvisor_restaurants_results > 0 and tripadvisor_geo_id
+        List of city dicts, in API order
     """
-    all_geoname_ids = []
-    page = 1
     page_size = 100
     
-    print(f"Fetching cities for country code: {country_code}")
+    first_page = fetch_country_cities_page(country_code, 1, page_size)
+    if first_page is None:
+        return []
+    
+    cities, count = first_page
+    cities = list(cities)
+    total_pages = -(-count // page_size)
+    
+    if cities and total_pages > 1:
+        logger.info(f"Fetching pages 2-{total_pages} for {country_code} "
+              f"with up to {PAGE_FETCH_WORKERS} concurrent requests...")
+        with ThreadPoolExecutor(max_workers=PAGE_FETCH_WORKERS) as executor:
+            # map keeps the pages in order
+            for page_result in executor.map(
+                lambda page: fetch_country_cities_page(country_code, page, page_size),
+                range(2, total_pages + 1),
+            ):
+                if page_result is not None:
+                    cities.extend(page_result[0])
+    
+    return cities
+
+
+def get_country_city_ids(country_code: str) -> Tuple[FrozenSet[str], List[int]]:
+    """
+    Get the TripAdvisor geo IDs and the geoname_ids of the cities in a specific
+    country from a single pass over its cities.
     
-    while True:
-        url = (
-            f"http://127.0.0.1:8000/api/cities/search/"
-            f"?page={page}"
-            f"&page_size={page_size}"
-            f"&country={country_code}"
-            f"&tripadvisor_geo_id_is_null=false"
-        )
+    Args:
+        country_code: ISO 2-letter country code (e.g., 'US', 'FR', 'DE')
         
-        print(f"Fetching page {page} for {country_code}...")
+    Returns:
+        Tuple of (TripAdvisor geo IDs as strings, geoname_ids for cities with
+        tripadvisor_restaurants_results > 0 and tripadvisor_geo_id)
+    """
+    logger.info(f"Fetching cities for country code: {country_code}")
+    
+    geo_ids = set()
+    geoname_ids = []
+    
+    for city in fetch_country_cities(country_code):
+        tripadvisor_geo_id = city.get('tripadvisor_geo_id')
+        if not tripadvisor_geo_id:
+            continue
         
-        try:
-            response = requests.get(url)
-            if response.status_code == 200:
-                data = response.json()
-                
-                # Handle different response structures
-                items = []
-                count = 0
-                
-                if isinstance(data, dict):
-                    # Try common pagination field names
-                    if 'items' in data:
-                        items = data.get('items', [])
-                        count = data.get('count', len(items))
-                    elif 'results' in data:
-                        items = data.get('results', [])
-                        count = data.get('count', len(items))
-                    elif 'data' in data:
-                        items = data.get('data', [])
-                        count = data.get('total', len(items))
-                    else:
-                        # Try to find a list value in the dict
-                        for key, value in data.items():
-                            if isinstance(value, list) and len(value) > 0:
-                                # Check if it looks like city data
-                                if isinstance(value[0], dict) and 'geoname_id' in value[0]:
-                                    items = value
-                                    count = data.get('count', len(items))
-                                    break
-                        
-                elif isinstance(data, list):
-                    items = data
-                    count = len(data)
-                
-                if not items:
-                    print(f"No more cities found on page {page}")
-                    break
-                
-                # Filter cities that have required data
-                valid_geoname_ids = []
-                for city in items:
-                    tripadvisor_geo_id = city.get('tripadvisor_geo_id')
-                    tripadvisor_restaurants_results = city.get('tripadvisor_restaurants_results', 0)
-                    geoname_id = city.get('geoname_id')
-                    
-                    if (tripadvisor_geo_id and 
-                        tripadvisor_restaurants_results > 0 and 
-                        geoname_id):
-                        valid_geoname_ids.append(geoname_id)
-                
-                if valid_geoname_ids:
-                    all_geoname_ids.extend(valid_geoname_ids)
-                    print(f"Found {len(valid_geoname_ids)} valid cities on page {page} "
-                          f"(total so far: {len(all_geoname_ids)})")
-                else:
-                    print(f"No valid cities found on page {page}")
-                
-                # Check if we should continue to next page
-                if len(items) < page_size:
-                    print("Reached end of results (fewer items than page_size)")
-                    break
-                
-                # If we have count info, check if we've reached the end
-                if count > 0:
-                    total_pages = (count + page_size - 1) // page_size
-                    if page >= total_pages:
-                        print(f"Reached last page ({page}/{total_pages})")
-                        break
-                
-                page += 1
-                
-            else:
-                print(f"API error: {response.status_code} - {response.text}")
-                break
-                
-        except Exception as e:
-            print(f"Error fetching cities: {e}")
-            break
+        geo_ids.add(str(tripadvisor_geo_id))
+        
+        # Filter cities that have required data
+        geoname_id = city.get('geoname_id')
+        if geoname_id and (city.get('tripadvisor_restaurants_results') or 0) > 0:
+            geoname_ids.append(geoname_id)
     
-    print(f"Total geoname_ids found for {country_code}: {len(all_geoname_ids)}")
-    return all_geoname_ids
+    logger.info(f"Total TripAdvisor geo IDs found for {country_code}: {len(geo_ids)}")
+    logger.info(f"Total geoname_ids found for {country_code}: {len(geoname_ids)}")
+    return frozenset(geo_ids), geoname_ids
+
+
+def build_restaurant_payload(data: dict) -> dict:
+    """Builds the API payload for a restaurant.
+
+    Args:
+        data (dict): Restaurant data from TripAdvisor JSON structure
+
+    Returns:
+        dict: Payload for the restaurants endpoint
+    """
+    # Safely extract rating information
+    aggregate_rating = data.get("aggregateRating", {})
+    rating_value = ""
+    review_count = ""
+    
+    if isinstance(aggregate_rating, dict):
+        rating_value = aggregate_rating.get("ratingValue", "")
+        review_count = aggregate_rating.get("reviewCount", "")
+    
+    # Safely extract address information
+    address = data.get("address", {})
+    if isinstance(address, dict):
+        street_address = address.get("streetAddress", "")
+        postal_code = address.get("postalCode", "")
+        city = address.get("addressLocality", "")
+        country = address.get("addressCountry", "")
+    else:
+        street_address = postal_code = city = country = ""
+    
+    # Safely extract image
+    image_list = data.get("image", [])
+    first_image = ""
+    if isinstance(image_list, list) and len(image_list) > 0:
+        first_image = image_list[0]
+    
+    return {
+        "name": data.get("name", ""),
+        "tripadvisor_detail_page": data.get("url", ""),
+        "address_string": street_address,
+        "postal_code": postal_code,
+        "city": city,
+        "country": country,
+        "rating": str(rating_value),
+        "num_reviews": str(review_count),
+        "price_range": data.get("priceRange", ""),
+        "phone": data.get("telephone", ""),
+        "image_urls": [first_image] if first_image else [],
+        "city_geoname_id": data.get("city_geoname_id", ""),
+    }
 
 
 def add_restaurant_basic_info(data: dict) -> dict:
@@ -260,77 +345,105 @@ def add_restaurant_basic_info(data: dict) -> dict:
         return {"error": "No data provided"}
     
     try:
-        # Safely extract rating information
-        aggregate_rating = data.get("aggregateRating", {})
-        rating_value = ""
-        review_count = ""
-        
-        if isinstance(aggregate_rating, dict):
-            rating_value = aggregate_rating.get("ratingValue", "")
-            review_count = aggregate_rating.get("reviewCount", "")
-        
-        # Safely extract address information
-        address = data.get("address", {})
-        if isinstance(address, dict):
-            street_address = address.get("streetAddress", "")
-            postal_code = address.get("postalCode", "")
-            city = address.get("addressLocality", "")
-            country = address.get("addressCountry", "")
-        else:
-            street_address = postal_code = city = country = ""
-        
-        # Safely extract image
-        image_list = data.get("image", [])
-        first_image = ""
-        if isinstance(image_list, list) and len(image_list) > 0:
-            first_image = image_list[0]
-        
-        payload = {
-            "name": data.get("name", ""),
-            "tripadvisor_detail_page": data.get("url", ""),
-            "address_string": street_address,
-            "postal_code": postal_code,
-            "city": city,
-            "country": country,
-            "rating": str(rating_value),
-            "num_reviews": str(review_count),
-            "price_range": data.get("priceRange", ""),
-            "phone": data.get("telephone", ""),
-            "image_urls": [first_image] if first_image else [],
-            "city_geoname_id": data.get("city_geoname_id", ""),
-        }
+        payload = build_restaurant_payload(data)
 
         url = "http://127.0.0.1:8000/api/restaurants/"
 
-        headers = {
-            "Content-Type": "application/json",
-            "Accept": "application/json",
-        }
-
-        # Fix: Don't double-encode JSON
-        response = requests.post(url, json=payload, headers=headers)
+        response = session.post(url, data=orjson.dumps(payload), headers=JSON_HEADERS, timeout=30)
 
         if response.status_code in [200, 201]:
-            print(f"Restaurant {data.get('name', '')} added successfully.")
-            return {"success": True, "response": response.json()}
+            logger.debug(f"Restaurant {data.get('name', '')} added successfully.")
+            return {"success": True, "response": orjson.loads(response.content)}
         else:
             error_detail = ""
             try:
-                error_detail = response.json()
-            except json.JSONDecodeError:
+                error_detail = orjson.loads(response.content)
+            except orjson.JSONDecodeError:
                 error_detail = response.text
             
-            print(f"Failed to add restaurant {data.get('name', '')}. "
+            logger.warning(f"Failed to add restaurant {data.get('name', '')}. "
                   f"Status: {response.status_code}")
-            print(f"Error details: {error_detail}")
+            logger.warning(f"Error details: {error_detail}")
             return {"error": f"API error {response.status_code}", 
                    "details": error_detail}
 
     except Exception as e:
-        print(f"Error processing restaurant {data.get('name', 'Unknown')}: {e}")
+        logger.error(f"Error processing restaurant {data.get('name', 'Unknown')}: {e}")
         return {"error": str(e)}
 
 
+def add_restaurants_one_by_one(restaurants: List[dict]) -> Tuple[int, int]:
+    """Adds restaurants with one request each, for APIs without the bulk endpoint."""
+    successful = sum(
+        1 for data in restaurants if add_restaurant_basic_info(data).get("success")
+    )
+    return successful, len(restaurants) - successful
+
+
+def add_restaurants_bulk(restaurants: List[dict]) -> Tuple[int, int]:
+    """Adds the restaurants of one list page to the API in a single request.
+
+    Falls back to one request per restaurant when the API has no bulk endpoint.
+
+    Args:
+        restaurants (List[dict]): Restaurant data from TripAdvisor JSON structure
+
+    Returns:
+        Tuple[int, int]: Number of restaurants added and number that failed
+    """
+    global bulk_endpoint_unsupported
+    if bulk_endpoint_unsupported:
+        return add_restaurants_one_by_one(restaurants)
+
+    url = "http://127.0.0.1:8000/api/restaurants/bulk/"
+
+    try:
+        payloads = [build_restaurant_payload(data) for data in restaurants]
+        response = session.post(url, data=orjson.dumps(payloads), headers=JSON_HEADERS, timeout=30)
+    except Exception as e:
+        logger.error(f"Error bulk adding {len(restaurants)} restaurants: {e}")
+        return 0, len(restaurants)
+
+    if response.status_code in [404, 405]:
+        bulk_endpoint_unsupported = True
+        return add_restaurants_one_by_one(restaurants)
+
+    if response.status_code not in [200, 201]:
+        logger.warning(f"Failed to bulk add {len(restaurants)} restaurants. "
+              f"Status: {response.status_code}")
+        return 0, len(restaurants)
+
+    # One status per submitted restaurant, in order
+    results = orjson.loads(response.content).get("results", [])
+    successful = sum(1 for item in results if item.get("status") in [200, 201])
+    logger.debug(f"Added {successful}/{len(restaurants)} restaurants in one request.")
+    return successful, len(restaurants) - successful
+
+
+def parse_spider_pages(body: bytes) -> List[Dict]:
+    """
+    Parse a Spider API response body into its pages.
+    
+    The body is already in memory, so it is decoded in one go with orjson.
+    
+    Args:
+        body: Raw Spider API response body
+        
+    Returns:
+        List of pages, each with its own size in bytes under '_raw_len'
+    """
+    if not body:
+        return []
+    
+    pages = orjson.loads(body)
+    if isinstance(pages, list):
+        for page in pages:
+            if isinstance(page, dict):
+                # A lone page is the whole body; others are measured on their own
+                page['_raw_len'] = len(body) if len(pages) == 1 else len(orjson.dumps(page))
+    return pages
+
+
 def detect_captcha(response_data: dict) -> bool:
     """
     Detect if response contains a CAPTCHA challenge.
@@ -344,31 +457,31 @@ def detect_captcha(response_data: dict) -> bool:
     if not response_data:
         return False
     
-    # Check for common CAPTCHA indicators in the response
-    captcha_indicators = [
-        'captcha', 'recaptcha', 'challenge', 'verify', 'robot',
-        'human verification', 'security check', 'access denied'
-    ]
-    
-    # Check HTML content if available
+    # Check the start of the HTML content if available
     html_content = response_data.get('content', '')
-    if html_content:
-        html_lower = html_content.lower()
-        for indicator in captcha_indicators:
-            if indicator in html_lower:
-                return True
+    if html_content and CAPTCHA_PATTERN.search(html_content, 0, CAPTCHA_SCAN_CHARS):
+        return True
     
     # Check page title
     title = response_data.get('title', '')
-    if title:
-        title_lower = title.lower()
-        for indicator in captcha_indicators:
-            if indicator in title_lower:
-                return True
+    if title and CAPTCHA_PATTERN.search(title):
+        return True
     
     return False
 
 
+def response_size(response_data: dict) -> int:
+    """
+    Size of a Spider API response in bytes, as measured when its body was parsed.
+    Falls back to the length of the page content for pages without that measure.
+    """
+    if '_raw_len' in response_data:
+        return response_data['_raw_len']
+    
+    content = response_data.get('content', '')
+    return len(content) if content else 0
+
+
 def validate_response_size(response_data: dict, min_size_kb: int = 10) -> bool:
     """
     Validate if response size meets minimum requirements.
@@ -383,202 +496,256 @@ def validate_response_size(response_data: dict, min_size_kb: int = 10) -> bool:
     if not response_data:
         return False
     
-    # Get content length from response
-    content = response_data.get('content', '')
-    content_size = len(content) if content else 0
+    return response_size(response_data) >= min_size_kb * 1024
+
+
+def collect_list_restaurants(item_list: List[Dict], geoname_id: int, expected_geo_ids: FrozenSet[str]) -> List[Dict]:
+    """
+    Collect the restaurants of a TripAdvisor item list for the restaurants API.
     
-    # Check if JSON data exists and has reasonable size
-    json_data = response_data.get('json_data', {})
-    json_size = len(str(json_data)) if json_data else 0
+    Args:
+        item_list: itemListElement entries of a restaurant list page
+        geoname_id: The geoname ID for the city
+        expected_geo_ids: Set of expected TripAdvisor geo IDs for validation (optional)
+        
+    Returns:
+        Restaurant data tagged with the city's geoname_id
+    """
+    restaurants = []
+    search_geo_id = GEO_ID_PATTERN.search  # Bound once; called for every item
     
-    total_size = content_size + json_size
-    min_size_bytes = min_size_kb * 1024
+    for list_item in item_list:
+        # Items with full data are nested in an "item" key; looked up once per item
+        item = list_item.get("item")
+        nested = isinstance(item, dict)
+        
+        # Skip restaurants from wrong locations if validation is enabled
+        if expected_geo_ids:
+            # Check if the restaurant URL contains a geo ID that matches expected ones
+            restaurant_url = (item if nested else list_item).get("url") or ""
+            
+            # One regex search per item; if we can't parse the geo ID, process anyway
+            geo_match = search_geo_id(restaurant_url)
+            if geo_match and geo_match.group(1) not in expected_geo_ids:
+                logger.debug(f"   ⚠️ Skipping restaurant from unexpected location (geo={geo_match.group(1)})")
+                continue
+        
+        # Handle items with full data (nested in "item" key)
+        if nested:
+            item["city_geoname_id"] = geoname_id
+            restaurants.append(item)
+        # Handle items with minimal data (name and url at top level)
+        elif "name" in list_item and "url" in list_item:
+            # Create a minimal restaurant entry with city_geoname_id
+            restaurants.append({
+                "name": list_item.get("name", ""),
+                "url": list_item.get("url", ""),
+                "city_geoname_id": geoname_id,
+                # Add empty address structure to ensure city_geoname_id is processed
+                "address": {}
+            })
     
-    return total_size >= min_size_bytes
+    return restaurants
+
+
+@dataclass(slots=True)
+class URLResult:
+    """Outcome of processing one restaurant list page URL."""
+    url: str
+    geoname_id: int
+    successful_restaurants: int = 0
+    failed_restaurants: int = 0
+    restaurants_found: bool = False
+    should_remove_url: bool = False
+    current_offset: int = 0
+    error: Optional[str] = None
+    captcha_detected: bool = False
+    response_too_small: bool = False
+    response_size_kb: float = 0
+    retry_attempt: int = 0  # Number of the next attempt, 0 when done
 
 
-def process_single_url(url_tuple: Tuple[str, str], geoname_id: int, expected_geo_ids: List[str] = None) -> Dict:
+def process_single_url(url_tuple: Tuple[str, str], geoname_id: int, expected_geo_ids: FrozenSet[str] = frozenset(), attempt: int = 1) -> URLResult:
     """
     Process a single URL and extract restaurant data.
     
+    Makes one attempt. When the URL should be tried again, retry_attempt holds
+    the number of the next attempt and the caller schedules it after its backoff,
+    so no worker sleeps.
+    
     Args:
         url_tuple: Tuple of (url, status)
         geoname_id: The geoname ID for the city
-        expected_geo_ids: List of expected TripAdvisor geo IDs for validation (optional)
+        expected_geo_ids: Set of expected TripAdvisor geo IDs for validation (optional)
+        attempt: Number of this attempt, from 1 to MAX_URL_ATTEMPTS
         
     Returns:
-        Dictionary with processing results
+        URLResult with the processing results
     """
     url, status = url_tuple
-    result = {
-        'url': url,
-        'geoname_id': geoname_id,
-        'successful_restaurants': 0,
-        'failed_restaurants': 0,
-        'restaurants_found': False,
-        'should_remove_url': False,
-        'current_offset': 0,
-        'error': None,
-        'captcha_detected': False,
-        'response_too_small': False,
-        'response_size_kb': 0
-    }
+    result = URLResult(url=url, geoname_id=geoname_id)
     
     # Extract offset from URL if present
-    if "offset=" in url:
-        try:
-            result['current_offset'] = int(url.split("offset=")[1].split("&")[0])
-        except ValueError:
-            result['current_offset'] = 0
+    offset = dict(parse_qsl(urlsplit(url).query)).get('offset', '0')
+    result.current_offset = int(offset) if offset.isdigit() else 0
     
     try:
-        max_retries = 3
-        retry_count = 0
+        response = parse_spider_pages(client.request_spider_api("detailed", url, raw=True))
+        page = response[0] if response else None
+        retry = True
         
-        while retry_count < max_retries and not result['restaurants_found']:
-            retry_count += 1  # Increment at the beginning to avoid infinite loops
-            
-            if retry_count > 1:
-                time.sleep(2 * (retry_count - 1))  # Exponential backoff
-            
-            response = client.request_spider_api("detailed", url)
-            
-            if response and len(response) > 0 and response[0] and response[0].get("error") is None:
-                # Check if we got a valid response
-                if "json_data" in response[0]:
-                    json_data = response[0]["json_data"]
-                    
-                    if "other_scripts" in json_data:
-                        for script in json_data["other_scripts"]:
-                            if isinstance(script, dict) and "itemListOrder" in script:
-                                item_list = script.get("itemListElement", [])
-                                
-                                if len(item_list) > 0:
-                                    result['restaurants_found'] = True
-                                    result['should_remove_url'] = False  # Don't remove URLs with restaurants!
-                                    
-                                    for list_item in item_list:
-                                        # Skip restaurants from wrong locations if validation is enabled
-                                        if expected_geo_ids:
-                                            # Check if the restaurant URL contains a geo ID that matches expected ones
-                                            restaurant_url = ""
-                                            if "item" in list_item and isinstance(list_item["item"], dict):
-                                                restaurant_url = list_item["item"].get("url", "")
-                                            elif "url" in list_item:
-                                                restaurant_url = list_item.get("url", "")
-                                            
-                                            # Extract geo ID from restaurant URL
-                                            if restaurant_url and "-g" in restaurant_url:
-                                                try:
-                                                    # TripAdvisor URLs typically have format: .../Restaurant_Review-g[geo_id]-...
-                                                    geo_part = restaurant_url.split("-g")[1].split("-")[0]
-                                                    if geo_part not in expected_geo_ids:
-                                                        print(f"   ⚠️ Skipping restaurant from unexpected location (geo={geo_part})")
-                                                        continue
-                                                except (IndexError, ValueError):
-                                                    pass  # If we can't parse, process anyway
-                                        
-                                        # Handle items with full data (nested in "item" key)
-                                        if "item" in list_item and isinstance(list_item["item"], dict):
-                                            list_item["item"]["city_geoname_id"] = geoname_id
-                                            api_result = add_restaurant_basic_info(list_item["item"])
-                                            if api_result.get("success"):
-                                                result['successful_restaurants'] += 1
-                                            else:
-                                                result['failed_restaurants'] += 1
-                                        # Handle items with minimal data (name and url at top level)
-                                        elif "name" in list_item and "url" in list_item:
-                                            # Create a minimal restaurant entry with city_geoname_id
-                                            minimal_data = {
-                                                "name": list_item.get("name", ""),
-                                                "url": list_item.get("url", ""),
-                                                "city_geoname_id": geoname_id,
-                                                # Add empty address structure to ensure city_geoname_id is processed
-                                                "address": {}
-                                            }
-                                            api_result = add_restaurant_basic_info(minimal_data)
-                                            if api_result.get("success"):
-                                                result['successful_restaurants'] += 1
-                                            else:
-                                                result['failed_restaurants'] += 1
-                
-                # Validate response and check for issues
-                if not result['restaurants_found']:
-                    # Check for CAPTCHA
-                    if detect_captcha(response[0]):
-                        result['captcha_detected'] = True
-                        result['error'] = "CAPTCHA detected"
-                        print(f"⚠️  CAPTCHA detected for URL: {url}")
-                        break  # Don't retry on CAPTCHA
+        if page and page.get("error") is None:
+            for script in page.get("json_data", {}).get("other_scripts", []):
+                if isinstance(script, dict) and "itemListOrder" in script:
+                    item_list = script.get("itemListElement", [])
                     
-                    # Check response size
-                    if not validate_response_size(response[0]):
-                        result['response_too_small'] = True
-                        # Calculate actual size for logging
-                        content = response[0].get('content', '')
-                        json_data_str = str(response[0].get('json_data', {}))
-                        result['response_size_kb'] = (len(content) + len(json_data_str)) / 1024
+                    if len(item_list) > 0:
+                        result.restaurants_found = True
                         
-                        if retry_count < max_retries:
-                            print(f"⚠️  Response too small ({result['response_size_kb']:.1f}KB), retrying... (attempt {retry_count}/{max_retries})")
-                            continue
-                        else:
-                            result['error'] = f"Response too small ({result['response_size_kb']:.1f}KB)"
-                    
-                    # Check status code
-                    if "status" in response[0]:
-                        status_code = response[0].get("status", 200)
-                        if status_code == 429:
-                            result['error'] = "Rate limited (429)"
-                            break  # Don't retry on rate limit
-                        elif status_code != 200 and retry_count < max_retries:
-                            continue
+                        # Restaurants are collected first and sent in one request
+                        restaurants = collect_list_restaurants(item_list, geoname_id, expected_geo_ids)
+                        if restaurants:
+                            successful, failed = add_restaurants_bulk(restaurants)
+                            result.successful_restaurants += successful
+                            result.failed_restaurants += failed
+            
+            # Only a page without restaurants needs to be checked for issues
+            if result.restaurants_found:
+                retry = False
+            elif detect_captcha(page):
+                result.captcha_detected = True
+                result.error = "CAPTCHA detected"
+                logger.warning(f"⚠️  CAPTCHA detected for URL: {url}")
+                retry = False  # Don't retry on CAPTCHA
+            elif not validate_response_size(page):
+                result.response_too_small = True
+                result.response_size_kb = response_size(page) / 1024
+                
+                if attempt < MAX_URL_ATTEMPTS:
+                    logger.warning(f"⚠️  Response too small ({result.response_size_kb:.1f}KB), retrying... (attempt {attempt}/{MAX_URL_ATTEMPTS})")
+                else:
+                    result.error = f"Response too small ({result.response_size_kb:.1f}KB)"
+            elif page.get("status", 200) == 429:
+                result.error = "Rate limited (429)"
+                retry = False  # Don't retry on rate limit
         
-        # Handle case where no restaurants found after all retries
-        if not result['restaurants_found']:
+        if retry and attempt < MAX_URL_ATTEMPTS:
+            result.retry_attempt = attempt + 1
+            return result
+        
+        # Handle case where no restaurants found after the last attempt
+        if not result.restaurants_found:
             # Only remove URL if we're certain it's an empty result page
             # Don't remove on CAPTCHA, rate limiting, or suspicious responses
-            if (response and len(response) > 0 and response[0] and 
-                response[0].get('error') is None and 
-                not result['captcha_detected'] and 
-                not result['response_too_small']):
+            if (page and
+                page.get('error') is None and 
+                not result.captcha_detected and 
+                not result.response_too_small):
                 
-                status_code = response[0].get("status", 200)
+                status_code = page.get("status", 200)
                 # Only remove if we got a valid 200 response with proper structure but no data
-                if status_code == 200 and validate_response_size(response[0]):
+                if status_code == 200 and validate_response_size(page):
                     # Double-check that the page structure exists but is empty
-                    json_data = response[0].get("json_data", {})
+                    json_data = page.get("json_data", {})
                     if "other_scripts" in json_data:
                         # Structure exists but no restaurants - safe to remove
-                        result['should_remove_url'] = True
+                        result.should_remove_url = True
                     else:
                         # Structure missing - might be blocked or error page
-                        result['should_remove_url'] = False
+                        result.should_remove_url = False
                 else:
                     # Don't remove on non-200 status or small responses
-                    result['should_remove_url'] = False
+                    result.should_remove_url = False
             else:
                 # Don't remove on error, CAPTCHA, or suspicious response
-                result['should_remove_url'] = False
+                result.should_remove_url = False
     
     except Exception as e:
-        result['error'] = str(e)
+        result.error = str(e)
         # Don't remove on exception, might be temporary issue
-        result['should_remove_url'] = False
+        result.should_remove_url = False
     
     return result
 
 
+def write_log_entries() -> None:
+    """
+    Write queued (path, entry) log lines as JSON. Runs on its own thread and
+    keeps each log file open, flushing whenever the queue runs empty.
+    A None item ends the loop; an entry that can't be written is logged and
+    skipped, so the queue keeps draining.
+    """
+    log_files = {}
+    
+    try:
+        while True:
+            item = LOG_QUEUE.get()
+            if item is None:
+                break
+            
+            try:
+                path, log_entry = item
+                if path not in log_files:
+                    log_files[path] = open(path, "ab", buffering=LOG_BUFFER_SIZE)
+                log_files[path].write(orjson.dumps(log_entry) + b"\n")
+                
+                if LOG_QUEUE.empty():
+                    for log_file in log_files.values():
+                        log_file.flush()
+            except Exception as e:
+                logger.error(f"Error writing log entry: {e}")
+    finally:
+        for log_file in log_files.values():
+            log_file.close()
+
+
+def stop_log_writer() -> None:
+    """Let the log writer drain the queue and close its files."""
+    if not log_writer.is_alive():
+        return
+    
+    try:
+        LOG_QUEUE.put(None, timeout=LOG_QUEUE_TIMEOUT)
+    except queue.Full:
+        logger.error("Log writer is stuck, unwritten log entries are lost")
+        return
+    log_writer.join()
+
+
+def add_log_entry(path: str, log_entry: dict) -> None:
+    """Queues a JSON line for the log writer thread."""
+    if not log_writer.is_alive():
+        logger.error(f"Log writer has stopped, dropping entry for {path}")
+        return
+    
+    try:
+        LOG_QUEUE.put((path, log_entry), timeout=LOG_QUEUE_TIMEOUT)
+    except queue.Full:
+        logger.error(f"Log queue stayed full, dropping entry for {path}")
+
+
 def add_request_log(url: str, status: str, response_time: float) -> None:
     """Logs the request details to a file."""
-    log_entry = {
+    add_log_entry("request_log.json", {
         "url": url,
         "status": status,
         "response_time": response_time,
-    }
+    })
+
+
+# Log lines are written by one thread, so workers never wait on a file. The
+# queue is bounded so a stalled disk can't grow it without limit; only then
+# do callers wait for the writer.
+LOG_QUEUE = queue.Queue(maxsize=10000)
+
+# Longest a caller waits for room in a full log queue before dropping its entry
+LOG_QUEUE_TIMEOUT = 30
 
-    with open("request_log.json", "a") as log_file:
-        log_file.write(json.dumps(log_entry) + "\n")
+# Write buffer of each log file; a burst of entries reaches the disk in 64 KB writes
+LOG_BUFFER_SIZE = 64 * 1024
+log_writer = threading.Thread(target=write_log_entries, name="log-writer", daemon=True)
+log_writer.start()
+atexit.register(stop_log_writer)
 
 
 if __name__ == "__main__":
@@ -622,211 +789,320 @@ if __name__ == "__main__":
         default=10,
         help='Maximum number of iterations in continuous mode (default: 10)'
     )
+    parser.add_argument(
+        '--verbose', '-v',
+        action='store_true',
+        help='Also log every scraped URL and added restaurant'
+    )
+    parser.add_argument(
+        '--workers', '-w',
+        type=int,
+        default=SCRAPER_WORKERS,
+        help=f'Number of URLs scraped concurrently (default: {SCRAPER_WORKERS})'
+    )
     
     args = parser.parse_args()
     country = args.country.upper() if not args.geo_id else None
     
-    # Print configuration
-    if args.geo_id:
-        print(f"Starting restaurant scraping for specific TripAdvisor geo_id: {args.geo_id}")
-    else:
-        print(f"Starting restaurant scraping for country: {country}")
-    print(f"URL status filter: {args.status}")
-    if args.limit and not args.geo_id:
-        print(f"City limit: {args.limit}")
-    if args.continuous:
-        print("Continuous mode: Will process until database is empty")
-    
-    # Main processing loop
-    iteration = 0
-    total_processed_overall = 0
-    total_successful_overall = 0
-    total_failed_overall = 0
-    urls_removed_overall = 0
-    
-    # Get expected TripAdvisor geo IDs for validation
-    expected_geo_ids = []
-    resolved_geoname_id = None  # To store the resolved geoname_id for tripadvisor_geo_id
-    
-    if args.geo_id:
-        # For specific tripadvisor_geo_id, lookup the corresponding geoname_id
-        resolved_geoname_id = get_geoname_id_from_tripadvisor_geo_id(args.geo_id)
-        if not resolved_geoname_id:
-            print(f"❌ Could not find geoname_id for TripAdvisor geo_id: {args.geo_id}")
-            exit(1)  # Exit with error code instead of return
-        # No location validation for specific geo_id
-        expected_geo_ids = []
-        print(f"Will process geoname_id: {resolved_geoname_id} (no location validation)")
+    # Per-URL and per-restaurant details are debug output, shown with --verbose.
+    # Lines are written by loguru's own thread so workers never wait on the terminal.
+    # When the output goes to a file or pipe it's written in LOG_BUFFER_SIZE blocks
+    # and flushed after every iteration summary; a terminal gets every line at once.
+    if sys.stderr.isatty():
+        log_output = sys.stderr
+        log_sink = sys.stderr
     else:
-        # Get expected TripAdvisor geo IDs for the country (for validation)
-        expected_geo_ids = get_tripadvisor_geo_ids_by_country(country)
-        print(f"Found {len(expected_geo_ids)} valid TripAdvisor geo IDs for {country}")
+        log_output = open(sys.stderr.fileno(), "w", buffering=LOG_BUFFER_SIZE,
+                          encoding="utf-8", closefd=False)
+        log_sink = log_output.write  # a plain callable, so loguru doesn't flush per line
     
-    while True:
-        iteration += 1
-        
-        if iteration > 1:
-            print(f"\n{'='*60}")
-            print(f"ITERATION {iteration}: Checking for remaining URLs")
-            print(f"{'='*60}")
-            
-            # Check max iterations
-            if args.continuous and iteration > args.max_iterations:
-                print(f"⚠️  Reached maximum iterations ({args.max_iterations}). Stopping.")
-                break
+    logger.remove()
+    logger.add(
+        log_sink,
+        format="{message}",
+        level="DEBUG" if args.verbose else "INFO",
+        enqueue=True,
+    )
+    
+    # Buffered log lines are written out however the run ends, and before a traceback
+    try:
+        # Both HTTP clients are shared by all workers, so give them a connection each;
+        # otherwise connections beyond the pool size are dropped after every request
+        if args.workers != SCRAPER_WORKERS:
+            client = SpiderAPI(pool_maxsize=args.workers)
+            session.mount("http://", local_api_adapter(args.workers))
         
-        # Get geoname IDs based on mode (specific geo_id or country)
+        # Print configuration
         if args.geo_id:
-            # Use the resolved geoname_id
-            geoname_ids = [resolved_geoname_id]
-            print(f"Processing single geoname_id: {resolved_geoname_id} (from TripAdvisor geo_id: {args.geo_id})")
+            logger.info(f"Starting restaurant scraping for specific TripAdvisor geo_id: {args.geo_id}")
         else:
-            geoname_ids = get_geoname_ids_by_country(country)
-            print(f"Found {len(geoname_ids)} cities with restaurant data in {country}")
-            
-            if args.limit and len(geoname_ids) > args.limit:
-                geoname_ids = geoname_ids[:args.limit]
-                print(f"Limited to first {args.limit} cities")
-
-        if not geoname_ids:
-            if args.geo_id:
-                print(f"No data found for TripAdvisor geo_id: {args.geo_id}")
-            else:
-                print("No geoname IDs found for the specified country.")
-            break
+            logger.info(f"Starting restaurant scraping for country: {country}")
+        logger.info(f"URL status filter: {args.status}")
+        if args.limit and not args.geo_id:
+            logger.info(f"City limit: {args.limit}")
+        if args.continuous:
+            logger.info("Continuous mode: Will process until database is empty")
         
-        urls = get_city_restaurant_urls_with_status(geoname_ids, args.status)
-        total_url_count = sum(len(url_list) for url_list in urls.values())
+        # Main processing loop
+        iteration = 0
+        total_processed_overall = 0
+        total_successful_overall = 0
+        total_failed_overall = 0
+        urls_removed_overall = 0
+        consecutive_idle = 0  # Continuous-mode iterations in a row without progress
         
-        if total_url_count == 0:
-            print(f"✅ All URLs have been processed! No {args.status} URLs remaining in database.")
-            break
+        # Get expected TripAdvisor geo IDs for validation
+        expected_geo_ids = frozenset()
+        country_geoname_ids = []
+        resolved_geoname_id = None  # To store the resolved geoname_id for tripadvisor_geo_id
         
         if args.geo_id:
-            print(f"Retrieved {total_url_count} {args.status} URLs for TripAdvisor geo_id {args.geo_id}")
+            # For specific tripadvisor_geo_id, lookup the corresponding geoname_id
+            resolved_geoname_id = get_geoname_id_from_tripadvisor_geo_id(args.geo_id)
+            if not resolved_geoname_id:
+                logger.error(f"❌ Could not find geoname_id for TripAdvisor geo_id: {args.geo_id}")
+                exit(1)  # Exit with error code instead of return
+            # No location validation for specific geo_id
+            expected_geo_ids = frozenset()
+            logger.info(f"Will process geoname_id: {resolved_geoname_id} (no location validation)")
         else:
-            print(f"Retrieved {total_url_count} {args.status} URLs from {len(urls)} cities in {country}")
-
-        total_urls = sum(len(url_list) for url_list in urls.values())
-        processed_urls = 0
-        successful_restaurants = 0
-        failed_restaurants = 0
-        skipped_urls = 0
-        urls_removed_this_iteration = 0
+            # Get expected TripAdvisor geo IDs for the country (for validation) and
+            # the cities to scrape, which don't change between iterations
+            expected_geo_ids, country_geoname_ids = get_country_city_ids(country)
+            logger.info(f"Found {len(expected_geo_ids)} valid TripAdvisor geo IDs for {country}")
         
-        print(f"\n{'='*60}")
-        print(f"PROCESSING {total_urls} URLs FROM {len(urls)} CITIES")
-        print("Using 5 concurrent workers for faster processing")
-        print(f"{'='*60}")
+        # One pool for the whole run, so continuous mode doesn't start and join
+        # its threads again for every iteration
+        executor = ThreadPoolExecutor(max_workers=args.workers, thread_name_prefix="scrape")
         
-        for geoname_id in urls:
-            city_urls = urls[geoname_id]
-            print(f"\n🏙️  Processing geoname_id: {geoname_id} ({len(city_urls)} URLs)")
+        while True:
+            iteration += 1
             
-            # Process all URLs without skipping based on offset
-            urls_to_process = city_urls
+            if iteration > 1:
+                logger.info(f"\n{'='*60}")
+                logger.info(f"ITERATION {iteration}: Checking for remaining URLs")
+                logger.info(f"{'='*60}")
+                
+                # Check max iterations
+                if args.continuous and iteration > args.max_iterations:
+                    logger.warning(f"⚠️  Reached maximum iterations ({args.max_iterations}). Stopping.")
+                    break
             
-            if not urls_to_process:
-                continue
+            # Get geoname IDs based on mode (specific geo_id or country)
+            if args.geo_id:
+                # Use the resolved geoname_id
+                geoname_ids = [resolved_geoname_id]
+                logger.info(f"Processing single geoname_id: {resolved_geoname_id} (from TripAdvisor geo_id: {args.geo_id})")
+            else:
+                geoname_ids = country_geoname_ids
+                logger.info(f"Found {len(geoname_ids)} cities with restaurant data in {country}")
+                
+                if args.limit and len(geoname_ids) > args.limit:
+                    geoname_ids = geoname_ids[:args.limit]
+                    logger.info(f"Limited to first {args.limit} cities")
+
+            if not geoname_ids:
+                if args.geo_id:
+                    logger.info(f"No data found for TripAdvisor geo_id: {args.geo_id}")
+                else:
+                    logger.info("No geoname IDs found for the specified country.")
+                break
+            
+            urls = get_city_restaurant_urls_with_status(geoname_ids, args.status)
+            total_url_count = sum(len(url_list) for url_list in urls.values())
+            
+            if total_url_count == 0:
+                logger.info(f"✅ All URLs have been processed! No {args.status} URLs remaining in database.")
+                break
+            
+            if args.geo_id:
+                logger.info(f"Retrieved {total_url_count} {args.status} URLs for TripAdvisor geo_id {args.geo_id}")
+            else:
+                logger.info(f"Retrieved {total_url_count} {args.status} URLs from {len(urls)} cities in {country}")
+
+            total_urls = total_url_count
+            processed_urls = 0
+            successful_restaurants = 0
+            failed_restaurants = 0
+            skipped_urls = 0
+            urls_removed_this_iteration = 0
+            
+            logger.info(f"\n{'='*60}")
+            logger.info(f"PROCESSING {total_urls} URLs FROM {len(urls)} CITIES")
+            logger.info(f"Using {args.workers} concurrent workers for faster processing")
+            logger.info(f"{'='*60}")
             
-            # Process URLs concurrently in batches of 5
-            batch_size = 5
-            for i in range(0, len(urls_to_process), batch_size):
-                batch = urls_to_process[i:i+batch_size]
+            # Every URL of the iteration goes through the pool as one stream, so a slow
+            # page only holds its own worker instead of a whole batch
+            tasks = (
+                (url_tuple, geoname_id)
+                for geoname_id, city_urls in urls.items()
+                for url_tuple in city_urls
+            )
+            tasks_left = True
+            
+            # Per-city progress, reported once a city's last URL is done
+            city_urls_left = {geoname_id: len(city_urls) for geoname_id, city_urls in urls.items()}
+            city_restaurants = Counter()
+            
+            # Only IN_FLIGHT_PER_WORKER URLs per worker are submitted at a time; the
+            # next one goes in as soon as another one finishes
+            max_in_flight = IN_FLIGHT_PER_WORKER * args.workers
+            future_to_url = {}
+            
+            # Retries waiting out their backoff: (ready_at, url_tuple, geoname_id, attempt)
+            retry_heap = []
+            
+            # Scraped URLs, removed from the database REMOVE_BATCH_SIZE at a time
+            urls_to_remove = []
+            
+            while tasks_left or future_to_url or retry_heap:
+                # Resubmit the retries whose backoff has passed
+                now = time.monotonic()
+                while retry_heap and retry_heap[0][0] <= now:
+                    _, url_tuple, geoname_id, attempt = heapq.heappop(retry_heap)
+                    future = executor.submit(process_single_url, url_tuple, geoname_id, expected_geo_ids, attempt)
+                    future_to_url[future] = (url_tuple, geoname_id)
+                
+                # Top up the window with new URLs
+                while tasks_left and len(future_to_url) < max_in_flight:
+                    task = next(tasks, None)
+                    if task is None:
+                        tasks_left = False
+                        break
+                    future = executor.submit(process_single_url, task[0], task[1], expected_geo_ids)
+                    future_to_url[future] = task
+                
+                if not future_to_url:
+                    # Nothing in flight: wait for the next retry, or end once the URLs ran out
+                    if retry_heap:
+                        time.sleep(retry_heap[0][0] - now)
+                    continue
                 
-                print(f"\n📦 Processing batch {i//batch_size + 1} ({len(batch)} URLs)")
+                # Wake up for the next finished URL or the next due retry
+                timeout = max(0, retry_heap[0][0] - now) if retry_heap else None
+                done, _ = wait(future_to_url, timeout=timeout, return_when=FIRST_COMPLETED)
                 
-                # Process batch concurrently
-                with ThreadPoolExecutor(max_workers=5) as executor:
-                    future_to_url = {
-                        executor.submit(process_single_url, url_tuple, geoname_id, expected_geo_ids): url_tuple 
-                        for url_tuple in batch
-                    }
+                for future in done:
+                    url_tuple, geoname_id = future_to_url.pop(future)
+                    try:
+                        result = future.result()
+                        
+                        # Soft failures go back in line instead of sleeping in a worker
+                        if result.retry_attempt:
+                            ready_at = time.monotonic() + 2 * (result.retry_attempt - 1)
+                            heapq.heappush(retry_heap, (ready_at, url_tuple, geoname_id, result.retry_attempt))
+                            continue
+                        
+                        processed_urls += 1
+                        
+                        # Update counters
+                        city_restaurants[geoname_id] += result.successful_restaurants
+                        successful_restaurants += result.successful_restaurants
+                        failed_restaurants += result.failed_restaurants
+                        
+                        # Enhanced output with more details
+                        offset_info = f" (offset={result.current_offset})" if result.current_offset > 0 else ""
+                        if result.restaurants_found:
+                            logger.debug(f"✓ [{processed_urls}/{total_urls}] {result.url}{offset_info} → {result.successful_restaurants} restaurants")
+                        elif result.captcha_detected:
+                            logger.warning(f"🔒 [{processed_urls}/{total_urls}] {result.url}{offset_info} → CAPTCHA detected (keeping for retry)")
+                        elif result.response_too_small:
+                            logger.warning(f"⚠️  [{processed_urls}/{total_urls}] {result.url}{offset_info} → Response too small ({result.response_size_kb:.1f}KB)")
+                        elif result.error:
+                            logger.warning(f"✗ [{processed_urls}/{total_urls}] {result.url}{offset_info} → Error: {result.error}")
+                        else:
+                            logger.debug(f"○ [{processed_urls}/{total_urls}] {result.url}{offset_info} → No results (empty page)")
+                        
+                        # Handle URL removal - remove successfully processed URLs OR confirmed empty pages
+                        if result.restaurants_found and result.successful_restaurants > 0:
+                            # Remove URL after successful processing
+                            urls_to_remove.append(result.url)
+                            logger.debug("   → Queued for removal (successfully processed)")
+                        elif result.should_remove_url:
+                            # Remove confirmed empty pages
+                            urls_to_remove.append(result.url)
+                            logger.debug("   → Queued for removal (confirmed empty page)")
+                        elif result.captcha_detected or result.response_too_small:
+                            # Log suspicious responses for monitoring; orjson formats the
+                            # timestamp as ISO 8601 on the log writer thread
+                            add_log_entry("suspicious_responses.log", {
+                                "timestamp": datetime.now(),
+                                "url": result.url,
+                                "captcha": result.captcha_detected,
+                                "too_small": result.response_too_small,
+                                "size_kb": result.response_size_kb,
+                                "error": result.error
+                            })
+                        
+                    except Exception as e:
+                        logger.error(f"✗ Error processing {url_tuple[0]}: {e}")
+                        failed_restaurants += 1
                     
-                    batch_results = []
-                    for future in as_completed(future_to_url):
-                        try:
-                            result = future.result()
-                            batch_results.append(result)
-                            processed_urls += 1
-                            
-                            # Update counters
-                            successful_restaurants += result['successful_restaurants']
-                            failed_restaurants += result['failed_restaurants']
-                            
-                            # Enhanced output with more details
-                            offset_info = f" (offset={result['current_offset']})" if result['current_offset'] > 0 else ""
-                            if result['restaurants_found']:
-                                print(f"✓ [{processed_urls}/{total_urls}] {result['url']}{offset_info} → {result['successful_restaurants']} restaurants")
-                            elif result['captcha_detected']:
-                                print(f"🔒 [{processed_urls}/{total_urls}] {result['url']}{offset_info} → CAPTCHA detected (keeping for retry)")
-                            elif result['response_too_small']:
-                                print(f"⚠️  [{processed_urls}/{total_urls}] {result['url']}{offset_info} → Response too small ({result['response_size_kb']:.1f}KB)")
-                            elif result['error']:
-                                print(f"✗ [{processed_urls}/{total_urls}] {result['url']}{offset_info} → Error: {result['error']}")
-                            else:
-                                print(f"○ [{processed_urls}/{total_urls}] {result['url']}{offset_info} → No results (empty page)")
-                            
-                            # Handle URL removal - remove successfully processed URLs OR confirmed empty pages
-                            if result['restaurants_found'] and result['successful_restaurants'] > 0:
-                                # Remove URL after successful processing
-                                if remove_city_restaurant_url(result['url']):
-                                    urls_removed_overall += 1
-                                    urls_removed_this_iteration += 1
-                                    print("   → Removed from queue (successfully processed)")
-                            elif result['should_remove_url']:
-                                # Remove confirmed empty pages
-                                if remove_city_restaurant_url(result['url']):
-                                    urls_removed_overall += 1
-                                    urls_removed_this_iteration += 1
-                                    print("   → Removed from queue (confirmed empty page)")
-                            elif result['captcha_detected'] or result['response_too_small']:
-                                # Log suspicious responses for monitoring
-                                with open("suspicious_responses.log", "a") as log_file:
-                                    log_entry = {
-                                        "timestamp": datetime.now().isoformat(),
-                                        "url": result['url'],
-                                        "captcha": result['captcha_detected'],
-                                        "too_small": result['response_too_small'],
-                                        "size_kb": result['response_size_kb'],
-                                        "error": result['error']
-                                    }
-                                    log_file.write(json.dumps(log_entry) + "\n")
-                            
-                        except Exception as e:
-                            url_tuple = future_to_url[future]
-                            print(f"✗ Error processing {url_tuple[0]}: {e}")
-                            failed_restaurants += 1
-        
-        # Update overall counters
-        total_processed_overall += processed_urls
-        total_successful_overall += successful_restaurants
-        total_failed_overall += failed_restaurants
+                    city_urls_left[geoname_id] -= 1
+                    if city_urls_left[geoname_id] == 0:
+                        logger.info(f"🏙️  Finished geoname_id: {geoname_id} "
+                              f"({len(urls[geoname_id])} URLs, {city_restaurants[geoname_id]} restaurants)")
+                    
+                    if len(urls_to_remove) >= REMOVE_BATCH_SIZE:
+                        removed = remove_city_restaurant_urls(urls_to_remove)
+                        urls_removed_overall += removed
+                        urls_removed_this_iteration += removed
+                        urls_to_remove = []
+            
+            # Remove the URLs left over from the last batch
+            removed = remove_city_restaurant_urls(urls_to_remove)
+            urls_removed_overall += removed
+            urls_removed_this_iteration += removed
+            
+            # Update overall counters
+            total_processed_overall += processed_urls
+            total_successful_overall += successful_restaurants
+            total_failed_overall += failed_restaurants
+            
+            # Iteration summary
+            logger.info(f"\n{'='*60}")
+            logger.info(f"ITERATION {iteration} SUMMARY")
+            logger.info(f"{'='*60}")
+            logger.info(f"📈 URLs processed: {processed_urls}")
+            logger.info(f"✅ Successful restaurants: {successful_restaurants}")
+            logger.info(f"❌ Failed restaurants: {failed_restaurants}")
+            logger.info(f"⏭️  URLs skipped: {skipped_urls}")
+            logger.info(f"🗑️  URLs removed from queue: {urls_removed_this_iteration}")
+            logger.info(f"🔄 URLs kept for retry: {processed_urls - urls_removed_this_iteration}")
+            logger.complete()
+            log_output.flush()
+            
+            # If not in continuous mode, break after first iteration
+            if not args.continuous:
+                break
+            
+            # An iteration that removed nothing from the queue (CAPTCHAs, small or failed
+            # responses) is likely to go the same way if repeated right away, so back off
+            if urls_removed_this_iteration == 0:
+                consecutive_idle += 1
+            else:
+                consecutive_idle = 0
+            
+            if consecutive_idle and iteration < args.max_iterations:
+                idle_sleep = min(IDLE_MAX_SLEEP, IDLE_BASE_SLEEP * 2 ** (consecutive_idle - 1))
+                logger.info(f"💤 No URLs removed this iteration, waiting {idle_sleep}s before the next one")
+                time.sleep(idle_sleep)
         
-        # Iteration summary
-        print(f"\n{'='*60}")
-        print(f"ITERATION {iteration} SUMMARY")
-        print(f"{'='*60}")
-        print(f"📈 URLs processed: {processed_urls}")
-        print(f"✅ Successful restaurants: {successful_restaurants}")
-        print(f"❌ Failed restaurants: {failed_restaurants}")
-        print(f"⏭️  URLs skipped: {skipped_urls}")
-        print(f"🗑️  URLs removed from queue: {urls_removed_this_iteration}")
-        print(f"🔄 URLs kept for retry: {processed_urls - urls_removed_this_iteration}")
+        executor.shutdown(wait=True)
         
-        # If not in continuous mode, break after first iteration
-        if not args.continuous:
-            break
-    
-    # Final overall summary
-    print(f"\n{'='*60}")
-    print("FINAL OVERALL SUMMARY")
-    print(f"{'='*60}")
-    print(f"📈 Total URLs processed: {total_processed_overall}")
-    print(f"✅ Total successful restaurants: {total_successful_overall}")
-    print(f"❌ Total failed restaurants: {total_failed_overall}")
-    print(f"🗑️  Total URLs removed from queue: {urls_removed_overall}")
-    print(f"🎯 Overall success rate: {(total_successful_overall/(total_successful_overall+total_failed_overall)*100):.1f}%" if (total_successful_overall+total_failed_overall) > 0 else "N/A")
+        # Final overall summary
+        logger.info(f"\n{'='*60}")
+        logger.info("FINAL OVERALL SUMMARY")
+        logger.info(f"{'='*60}")
+        logger.info(f"📈 Total URLs processed: {total_processed_overall}")
+        logger.info(f"✅ Total successful restaurants: {total_successful_overall}")
+        logger.info(f"❌ Total failed restaurants: {total_failed_overall}")
+        logger.info(f"🗑️  Total URLs removed from queue: {urls_removed_overall}")
+        logger.info(f"🎯 Overall success rate: {(total_successful_overall/(total_successful_overall+total_failed_overall)*100):.1f}%" if (total_successful_overall+total_failed_overall) > 0 else "N/A")
+    finally:
+        logger.complete()
+        log_output.flush()
                             
 
 
@@ -1,9 +1,36 @@
 import sqlite3
 import os
-from typing import Optional, List, Dict, Tuple
+from typing import Optional, List, Dict, Set, Tuple
 
 DATABASE_FILE = "city_restaurant_links.db"
 
+# Applied to every connection. synchronous=NORMAL is safe under WAL: commits stay
+# atomic and only skip the fsync, which is fine for a table we can regenerate.
+CONNECTION_PRAGMAS = [
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-131072",  # 128 MB
+    "PRAGMA mmap_size=268435456",  # 256 MB
+    "PRAGMA wal_autocheckpoint=10000",
+]
+
+INSERT_CITY_RESTAURANT_SQL = """
+    INSERT OR IGNORE INTO city_restaurant_links (geoname_id, url, status)
+    VALUES (?, ?, ?)
+"""
+
+
+def get_connection() -> sqlite3.Connection:
+    """
+    Open a configured connection to the database.
+    Callers that batch several writes into one transaction commit and close it themselves.
+    """
+    conn = sqlite3.connect(DATABASE_FILE, timeout=30.0)  # 30 second busy timeout
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
 
 def init_database():
     """Initialize the database and create tables if they don't exist."""
@@ -14,12 +41,9 @@ def init_database():
         print(f"Database file '{DATABASE_FILE}' does not exist. Creating...")
 
     # Connect to database (creates file if it doesn't exist)
-    conn = sqlite3.connect(DATABASE_FILE)
+    # WAL mode for better concurrent access is set by get_connection
+    conn = get_connection()
     cursor = conn.cursor()
-    
-    # Enable WAL mode for better concurrent access
-    cursor.execute("PRAGMA journal_mode=WAL")
-    cursor.execute("PRAGMA busy_timeout=30000")  # 30 second timeout
 
     # Create city_restaurant_links table
     cursor.execute(
@@ -32,6 +56,14 @@ def init_database():
     """
     )
 
+    # url is UNIQUE, which already gives it an index; the scraper reads by city
+    cursor.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_city_restaurant_links_geoname_id
+        ON city_restaurant_links (geoname_id)
+    """
+    )
+
     conn.commit()
     conn.close()
 
@@ -55,7 +87,7 @@ def add_city_restaurant(
         bool: True if successful, False otherwise
     """
     try:
-        conn = sqlite3.connect(DATABASE_FILE)
+        conn = get_connection()
         cursor = conn.cursor()
 
         cursor.execute(
@@ -77,6 +109,47 @@ def add_city_restaurant(
         return False
 
 
+def write_city_restaurant_batch(
+    conn: sqlite3.Connection,
+    clear_geoname_ids: List[int],
+    rows: List[Tuple[int, str, str]],
+) -> Tuple[int, int]:
+    """
+    Write a batch of restaurant URLs spanning several cities in the caller's transaction.
+    The URLs of the cities in clear_geoname_ids are removed before the rows are inserted.
+
+    Args:
+        conn: Open connection; the caller commits
+        clear_geoname_ids: GeoName IDs of the cities whose existing URLs are replaced
+        rows: (geoname_id, url, status) tuples to insert
+
+    Returns:
+        tuple: (URLs removed, URLs added)
+    """
+    changes_before = conn.total_changes
+    conn.executemany(
+        "DELETE FROM city_restaurant_links WHERE geoname_id = ?",
+        ((geoname_id,) for geoname_id in clear_geoname_ids),
+    )
+    removed_count = conn.total_changes - changes_before
+
+    changes_before = conn.total_changes
+    conn.executemany(INSERT_CITY_RESTAURANT_SQL, rows)
+    added_count = conn.total_changes - changes_before
+
+    return removed_count, added_count
+
+
+def analyze_database(conn: sqlite3.Connection) -> None:
+    """
+    Refresh the query planner statistics after a bulk load.
+
+    Args:
+        conn: Open connection; the caller commits
+    """
+    conn.execute("ANALYZE city_restaurant_links")
+
+
 def update_city_restaurant(
     url: str, geoname_id: Optional[int] = None, status: Optional[str] = None
 ) -> bool:
@@ -96,7 +169,7 @@ def update_city_restaurant(
         return False
 
     try:
-        conn = sqlite3.connect(DATABASE_FILE)
+        conn = get_connection()
         cursor = conn.cursor()
 
         # Build update query dynamically based on provided parameters
@@ -149,7 +222,7 @@ def get_city_restaurant_urls(geoname_ids: List[int]) -> Dict[int, List[str]]:
         return {}
     
     try:
-        conn = sqlite3.connect(DATABASE_FILE)
+        conn = get_connection()
         cursor = conn.cursor()
         
         # Create placeholders for the IN clause
@@ -200,7 +273,7 @@ def get_city_restaurant_urls_with_status(
         return {}
     
     try:
-        conn = sqlite3.connect(DATABASE_FILE)
+        conn = get_connection()
         cursor = conn.cursor()
         
         # Create placeholders for the IN clause
@@ -241,6 +314,34 @@ def get_city_restaurant_urls_with_status(
         return {}
 
 
+def get_all_city_restaurant_urls(conn: Optional[sqlite3.Connection] = None) -> Set[str]:
+    """
+    Get every restaurant URL in the database, to filter out known URLs before inserting.
+
+    Args:
+        conn: Optional open connection to read through
+
+    Returns:
+        set: All stored URLs
+    """
+    own_conn = conn is None
+
+    try:
+        if own_conn:
+            conn = get_connection()
+
+        urls = {url for (url,) in conn.execute("SELECT url FROM city_restaurant_links")}
+
+        if own_conn:
+            conn.close()
+
+        return urls
+
+    except Exception as e:
+        print(f"Error retrieving all restaurant URLs: {e}")
+        return set()
+
+
 def remove_city_restaurant_url(url: str) -> bool:
     """
     Remove a URL from the database after successful scraping.
@@ -252,7 +353,7 @@ def remove_city_restaurant_url(url: str) -> bool:
         bool: True if successfully removed, False otherwise
     """
     try:
-        conn = sqlite3.connect(DATABASE_FILE)
+        conn = get_connection()
         cursor = conn.cursor()
         
         cursor.execute(
@@ -271,6 +372,47 @@ def remove_city_restaurant_url(url: str) -> bool:
         return False
 
 
+def remove_city_restaurant_urls(
+    urls: List[str], conn: Optional[sqlite3.Connection] = None
+) -> int:
+    """
+    Remove scraped URLs from the database in a single transaction.
+
+    Args:
+        urls: The URLs to remove from the database
+        conn: Optional open connection; its transaction is left for the caller to commit
+
+    Returns:
+        int: Number of URLs removed
+    """
+    if not urls:
+        return 0
+
+    own_conn = conn is None
+
+    try:
+        if own_conn:
+            conn = get_connection()
+        changes_before = conn.total_changes
+
+        # One prepared statement and one commit for the whole batch instead of one per URL
+        conn.executemany(
+            "DELETE FROM city_restaurant_links WHERE url = ?",
+            ((url,) for url in urls),
+        )
+
+        removed_count = conn.total_changes - changes_before
+        if own_conn:
+            conn.commit()
+            conn.close()
+        return removed_count
+    except Exception as e:
+        if not own_conn:
+            raise
+        print(f"Error removing URLs from database: {e}")
+        return 0
+
+
 if __name__ == "__main__":
     # Initialize the database
     init_database()
@@ -295,7 +437,7 @@ if __name__ == "__main__":
     )
 
     # Verify the data
-    conn = sqlite3.connect(DATABASE_FILE)
+    conn = get_connection()
     cursor = conn.cursor()
     cursor.execute("SELECT * FROM city_restaurant_links")
     rows = cursor.fetchall()
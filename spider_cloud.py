@@ -1,4 +1,6 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import os
 from fake_useragent import UserAgent
 import dotenv
@@ -6,18 +8,27 @@ import dotenv
 dotenv.load_dotenv()
 
 class SpiderAPI:
-    def __init__(self):
+    def __init__(self, pool_maxsize: int = 10):
         self.api_key = os.getenv("SPIDER_API_KEY")
         self.ua = UserAgent(platforms='desktop')
         if not self.api_key:
             raise ValueError("SPIDER_API_KEY environment variable is not set.")
 
-    def request_spider_api(self, profile: str, url: str) -> dict:
-        headers = {
+        # Keep-alive connections to api.spider.cloud, shared by all calling threads.
+        # Only failed connects are retried here: a scrape POST that reached the API
+        # is billed, so its retries are left to the caller.
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=pool_maxsize,
+            max_retries=Retry(total=3, read=0, status=0, backoff_factor=0.5),
+        ))
+        self.session.headers.update({
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
-        }
+        })
 
+    def request_spider_api(self, profile: str, url: str, raw: bool = False):
         json_data = {
             "url": url,
             "request": "http",
@@ -95,11 +106,12 @@ class SpiderAPI:
         else:
             json_data["proxy"] = "residential"
 
-        response = requests.post(
-            "https://api.spider.cloud/scrape", headers=headers, json=json_data
+        response = self.session.post(
+            "https://api.spider.cloud/scrape", json=json_data
         )
 
         if response.status_code == 200:
-            return response.json()
+            # raw=True hands back the undecoded body so callers can decode and measure it themselves
+            return response.content if raw else response.json()
         else:
             response.raise_for_status()